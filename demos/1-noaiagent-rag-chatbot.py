@@ -13,27 +13,28 @@
 
 # TBD
 import click
-from services.vectordb_service import poor_mans_vectordb, search_vectordb
-from services.openai_service import get_chat_completion, manage_conversation
+from services.bm25_service import BM25Index
+from services.ingestion_service import ingest_directory
+from services.vectordb_service import search_hybrid
+from services.conversation_store_service import ConversationStore
+from services.kvstore_factory import create_store
+from services.response_cache_service import SemanticResponseCache
 from services.logger_service import get_logger
 
 logger = get_logger(__name__)
 
-conversations = {}
+store = create_store()
+conversations = ConversationStore(
+    "You are a helpful assistant. Use the provided context to answer user queries.",
+    store=store,
+)
 vectordb = None
+lexical = None
+response_cache = SemanticResponseCache()
 
 
 async def process(userid, prompt):
-    # See if the conversation exists for the user
-    if userid not in conversations:
-        conversations[userid] = [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant. Use the provided context to answer user queries.",
-            }
-        ]
-    conversation = conversations[userid]
-    results = await search_vectordb(prompt, vectordb)
+    results = await search_hybrid(prompt, vectordb, lexical)
 
     context = ""
     if results:
@@ -42,21 +43,30 @@ async def process(userid, prompt):
 
     # Create and add a user message to the conversation
     message = {"role": "user", "content": prompt + "\n\n" + context}
-    conversation.append(message)
+    conversations.append(userid, message)
     click.echo(click.style(f"{userid}: {prompt}", fg="cyan"))
 
-    # process the completion
-    res = await get_chat_completion(messages=manage_conversation(conversation))
+    # process the completion, printing it as it streams in
+    click.echo(click.style("Assistant: ", fg="green"), nl=False)
+    pieces = []
+    async for piece in response_cache.stream(await conversations.window(userid)):
+        pieces.append(piece)
+        click.echo(click.style(piece, fg="green"), nl=False)
+    click.echo()
+    res = "".join(pieces)
 
     # Add the completion content to the conversation
-    conversation.append({"role": "assistant", "content": res})
-    click.echo(click.style(f"Assistant: {res}", fg="green"))
+    conversations.append(userid, {"role": "assistant", "content": res})
 
 
 async def main():
-    global vectordb
+    global vectordb, lexical
 
-    vectordb = await poor_mans_vectordb()
+    # Only new or changed documents are chunked and embedded again
+    ingestor = await ingest_directory(
+        "demos/data", store, "demos/data/docs.vidx", lexical=BM25Index()
+    )
+    vectordb, lexical = ingestor.index, ingestor.lexical
     await process("user1", "List three restaurants in London?")
     await process("user1", "List three more")
     await process("user1", "What time is it?")
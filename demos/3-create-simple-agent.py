@@ -4,7 +4,6 @@
 # - Implement a cleanup function to remove agents and threads
 
 
-from time import sleep
 from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
 
@@ -14,6 +13,7 @@ import click
 # from services.message_processing import process_last_message
 from services.ckvstore_service import CategoryKeyValueStore
 from services.common import agent_cleanup
+from services.run_poller import RunPoller
 from services.settings_service import get_settings
 from services.logger_service import get_logger
 
@@ -23,6 +23,7 @@ logger = get_logger(__name__)
 store = CategoryKeyValueStore()
 AGENT_NAME = "simple-agent"
 CLEANUP = False
+poller = RunPoller()
 
 
 project_client = AIProjectClient(
@@ -67,34 +68,34 @@ def process(user_id: str, prompt: str) -> str:
         thread_id=thread.id, role="user", content=prompt
     )
 
+    def cancel_run():
+        project_client.agents.runs.cancel(thread_id=thread.id, run_id=run.id)
+
+    def requires_action(run):
+        print("Run requires action, cancelling...")
+        cancel_run()
+
     run = project_client.agents.runs.create(thread_id=thread.id, agent_id=agent.id)
-    while True:
-        run = project_client.agents.runs.get(thread_id=thread.id, run_id=run.id)
-        logger.info(f"Agent running with status: {run.status}")
-        if run.status == "completed":
-            messages = project_client.agents.messages.list(thread_id=thread.id)
-            # return process_last_message(project_client, messages)
-            # return messages.data[0].content if messages else "No response"
-            for message in messages:
-                for content in message.content:
-                    if content.type == "text":
-                        click.echo(f"{message.role.value} : {content.text.value}")
-                    else:
-                        click.echo(f"Non-text content: {content.type}")
-                if message.role == "user":
-                    break
-            return
-        if (
-            run.status == "expired"
-            or run.status == "failed"
-            or run.status == "cancelled"
-        ):
-            print("Run failed, expired or cancelled")
-            return ""
-        if run.status == "requires_action":
-            print("Run requires action, retrying...")
-            return ""
-        sleep(0.5)
+    run = poller.wait(
+        lambda: project_client.agents.runs.get(thread_id=thread.id, run_id=run.id),
+        cancel_run,
+        requires_action,
+    )
+    if run.status == "completed":
+        messages = project_client.agents.messages.list(thread_id=thread.id)
+        # return process_last_message(project_client, messages)
+        # return messages.data[0].content if messages else "No response"
+        for message in messages:
+            for content in message.content:
+                if content.type == "text":
+                    click.echo(f"{message.role.value} : {content.text.value}")
+                else:
+                    click.echo(f"Non-text content: {content.type}")
+            if message.role == "user":
+                break
+        return
+    print("Run failed, expired, cancelled or timed out")
+    return ""
 
     # run = project_client.agents.create_and_process_run(
     #     thread_id=thread.id, agent_id=agent.id
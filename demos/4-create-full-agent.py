@@ -3,7 +3,6 @@
 # - Added Tools, Code Interpreter, File Search
 
 import json
-from time import sleep
 import uuid
 
 import click
@@ -29,6 +28,7 @@ from tools.tools import tools_delegate, user_functions
 # NOTE: Added the CKVStore
 from services.ckvstore_service import CategoryKeyValueStore
 from services.common import agent_cleanup, get_openai_file
+from services.run_poller import RunPoller
 from services.settings_service import get_settings
 from services.logger_service import get_logger
 
@@ -38,6 +38,7 @@ logger = get_logger(__name__)
 store = CategoryKeyValueStore()
 AGENT_NAME = "full-agent"
 CLEANUP = True
+poller = RunPoller()
 
 
 project_client = AIProjectClient.from_connection_string(
@@ -112,23 +113,20 @@ def process(userid: str, prompt: str) -> str:
     )
 
     run = project_client.agents.create_run(thread_id=thread.id, agent_id=agent.id)
-    while True:
-        run = project_client.agents.get_run(thread_id=thread.id, run_id=run.id)
-        logger.info(f"Agent running with status: {run.status}")
-        if run.status == "completed":
-            messages = project_client.agents.list_messages(thread_id=thread.id)
-            # return messages.data[0].content if messages else "No response"
-            return process_last_message(project_client, messages)
-        if (
-            run.status == "expired"
-            or run.status == "failed"
-            or run.status == "cancelled"
-        ):
-            print("Run failed, expired or cancelled")
-            return ""
-        if run.status == "requires_action":
-            tools_delegate(project_client, thread, run)
-        sleep(0.5)
+    run = poller.wait(
+        lambda: project_client.agents.get_run(thread_id=thread.id, run_id=run.id),
+        lambda: project_client.agents.cancel_run(thread_id=thread.id, run_id=run.id),
+        lambda run: tools_delegate(project_client, thread, run),
+    )
+    if run.status == "completed":
+        # Only the newest message of this run, not the whole thread
+        messages = project_client.agents.list_messages(
+            thread_id=thread.id, run_id=run.id, order="desc", limit=1
+        )
+        # return messages.data[0].content if messages else "No response"
+        return process_last_message(project_client, messages)
+    print("Run failed, expired, cancelled or timed out")
+    return ""
 
     # run = project_client.agents.create_and_process_run(
     #     thread_id=thread.id, agent_id=agent.id
@@ -3,7 +3,7 @@ import click
 from services.ckvstore_service import CategoryKeyValueStore
 from services.agent_service import AgentService
 from azure.ai.agents.models import FunctionTool, ToolSet
-from tools.tools import tools_delegate, user_functions
+from tools.tools import tool_outputs_for, tools_delegate, user_functions
 
 CLEAN_UP = True
 AGENT_NAME = "full-agent-class"
@@ -19,7 +19,12 @@ if __name__ == "__main__":
     state = CategoryKeyValueStore()
     agent_id = state.get(AGENT_NAME, "agentid")
 
-    agent = AgentService(AGENT_NAME, toolset=tool_set, tools_delegate=tools_delegate)
+    agent = AgentService(
+        AGENT_NAME,
+        toolset=tool_set,
+        tools_delegate=tools_delegate,
+        tool_outputs=tool_outputs_for,
+    )
     agent.create_or_reload_agent(agent_id)
 
     # Process a user's prompt using the agent
@@ -27,6 +32,11 @@ if __name__ == "__main__":
         click.style(agent.process("user2", "What is the current time?"), fg="green")
     )
 
+    # Or stream the response as it is generated
+    for delta in agent.process_stream("user2", "What is the weather in Seattle?"):
+        click.echo(click.style(delta, fg="green"), nl=False)
+    click.echo()
+
     if CLEAN_UP:
         # clean the files, threads, and agent
         agent.clean_up()
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi import HTTPException
 import uvicorn
@@ -5,13 +7,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 
-from services.ckvstore_service import CategoryKeyValueStore
-from services.agent_service import AgentService
+from services.kvstore_factory import create_store
+from services.async_agent_service import AsyncAgentService
 from azure.ai.agents.models import FunctionTool, ToolSet
-from tools.tools import tools_delegate, user_functions
+from tools.tools import async_tools_delegate, user_functions
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The async agent client needs the server's event loop
+    await agent.create_or_reload_agent(agent_id)
+    yield
+    # Close the client, its credential and the store on the same loop
+    await agent.close()
+
 
 # region: FastAPI Setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 class ProcessRequest(BaseModel):
@@ -43,8 +55,9 @@ app.add_middleware(
 # region: Agent setup
 CLEAN_UP = True
 AGENT_NAME = "api-agent-demo"
+THREAD_TTL = 7 * 24 * 60 * 60  # forget threads of users idle for a week
 
-state = CategoryKeyValueStore()
+state = create_store()
 agent_id = state.get(AGENT_NAME, "agentid")
 
 functions = FunctionTool(functions=user_functions)
@@ -52,8 +65,12 @@ tool_set = ToolSet()
 tool_set.add(functions)
 # endregion
 
-agent = AgentService(AGENT_NAME, toolset=tool_set, tools_delegate=tools_delegate)
-agent.create_or_reload_agent(agent_id)
+agent = AsyncAgentService(
+    AGENT_NAME,
+    toolset=tool_set,
+    tools_delegate=async_tools_delegate,
+    thread_ttl=THREAD_TTL,
+)
 
 
 @app.post("/process", response_model=ProcessResponse)
@@ -65,7 +82,7 @@ async def process(
         # the user id and prompt are required
         raise HTTPException(status_code=400, detail="userid and prompt are required")
 
-    response = str(agent.process(request.userid, request.prompt))
+    response = str(await agent.process(request.userid, request.prompt))
     return ProcessResponse(content=response)
 
 
@@ -73,7 +90,7 @@ async def process(
 async def reset_thread(
     request: ResetRequest,
 ):
-    agent.reset_user_thread(request.userid)
+    await agent.reset_user_thread(request.userid)
     return ResetResponse(message=f"Thread for user {request.userid} has been reset.")
 
 
@@ -1,17 +1,26 @@
-from time import sleep
-from services.common import agent_cleanup
+import threading
+from collections import deque
+from typing import Callable, Iterator
+
+from services.common import ThreadHandle, ThreadHandleCache, agent_cleanup
+from services.run_poller import RunPoller
 from services.settings_service import get_settings
-from services.ckvstore_service import CategoryKeyValueStore
+from services.kvstore_base import KeyValueStoreBase
+from services.kvstore_factory import create_store
 from services.logger_service import get_logger
 
+from azure.core.exceptions import ResourceNotFoundError
 from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
-from azure.ai.agents.models import Agent, ToolSet
-from azure.ai.projects.models import (
-    OpenAIPageableListOfThreadMessage,
+from azure.ai.agents.models import (
+    Agent,
+    AgentStreamEvent,
+    MessageDeltaChunk,
+    SubmitToolOutputsAction,
     ThreadMessage,
+    ThreadRun,
     MessageContent,
-    MessageTextContent,
+    ToolSet,
 )
 
 logger = get_logger(__name__)
@@ -23,8 +32,8 @@ client_instance = None
 def get_client_instance():
     global client_instance
     if not client_instance:
-        client_instance = AIProjectClient.from_connection_string(
-            conn_str=get_settings().connection_string,
+        client_instance = AIProjectClient(
+            endpoint=get_settings().endpoint,
             credential=DefaultAzureCredential(),
         )
     return client_instance
@@ -38,15 +47,38 @@ class AgentService:
         instructions: str = "You are a helpful assistant.",
         toolset: ToolSet | None = None,
         tools_delegate=None,
+        thread_ttl: float | None = None,
+        poller: RunPoller | None = None,
+        tool_outputs: Callable[[ThreadRun], list[dict]] | None = None,
+        thread_pool_size: int = 2,
     ):
         self.client: AIProjectClient | None = None
         self.agent: Agent = None  # Placeholder for the agent object
-        self.state: CategoryKeyValueStore = CategoryKeyValueStore()
+        # Thread and agent ids are re-read on every turn and rarely change. They
+        # are plain strings, so they are stored raw instead of as JSON.
+        self.state: KeyValueStoreBase = create_store(
+            cache_size=4096, cache_ttl=300, codecs={name: "raw"}
+        )
         self.name: str = name
         self.description: str = description
         self.instructions: str = instructions
         self.toolset: ToolSet = toolset
         self.tools_delegate = tools_delegate
+        # Idle user threads are forgotten (and deleted remotely) after this many seconds
+        self.thread_ttl: float | None = thread_ttl
+        self.poller: RunPoller = poller or RunPoller()
+        # Streamed runs submit tool outputs themselves, see process_stream
+        self.tool_outputs = tool_outputs
+        # Fresh threads created ahead of time, so new users skip threads.create.
+        # They are stored as "pool-<thread id>" so agent_cleanup deletes them.
+        self.thread_pool_size = thread_pool_size
+        self._thread_pool: deque[str] = deque()
+        self._threads = ThreadHandleCache()
+        self._pool_lock = threading.Lock()
+        self._pool_filler: threading.Thread | None = None
+        # One long-lived filler thread, woken by _refill_thread_pool
+        self._pool_wanted = threading.Event()
+        self._pool_stopping = False
 
     def create_or_reload_agent(self, agent_id: str | None = None) -> None:
         """Create a new agent or recall an existing one."""
@@ -65,28 +97,110 @@ class AgentService:
                 toolset=self.toolset,
             )
             self.state.set(self.name, "agentid", self.agent.id)
+        if self.thread_ttl is not None:
+            self.state.start_expiry_sweeper(on_expire=self._on_key_expired)
+        # Threads pooled by an earlier run are still fresh
+        self._thread_pool.extend(
+            thread_id for _, thread_id in self.state.iter_category(self.name, "pool-")
+        )
+        self._refill_thread_pool()
+
+    def _on_key_expired(self, category: str, key: str, value) -> None:
+        """Delete the remote thread of an expired user thread mapping."""
+        if category != self.name or not key.startswith("thread-"):
+            return
+        self._threads.discard(key[len("thread-") :])
+        logger.info(f"Deleting expired thread {value} for key: {key}")
+        self.client.agents.threads.delete(value)
 
     def reset_user_thread(self, userid: str) -> None:
         """
         Reset the thread for a specific user by removing the stored thread ID.
         """
+        self._threads.discard(userid)
         if self.state.exists(self.name, "thread-" + userid):
             self.state.delete(self.name, "thread-" + userid)
         else:
             logger.warning(f"No thread found for user {userid} to reset.")
 
-        thread = self.client.agents.create_thread()
-        self.state.set(self.name, "thread-" + userid, thread.id)
+        self._assign_thread(userid)
         logger.info(f"Thread for user {userid} has been reset.")
 
-    def process_messages(self, messages: OpenAIPageableListOfThreadMessage) -> str:
+    def _fill_thread_pool(self) -> None:
+        try:
+            while len(self._thread_pool) < self.thread_pool_size:
+                thread_id = self.client.agents.threads.create().id
+                self.state.set(self.name, "pool-" + thread_id, thread_id)
+                self._thread_pool.append(thread_id)
+        except Exception as e:
+            logger.exception(f"Error pre-creating threads: {e}")
+
+    def _run_thread_pool(self) -> None:
+        while True:
+            self._pool_wanted.wait()
+            if self._pool_stopping:
+                return
+            self._pool_wanted.clear()
+            self._fill_thread_pool()
+
+    def _refill_thread_pool(self) -> None:
+        """Top up the pool of fresh threads in the background."""
+        if not self.thread_pool_size:
+            return
+        with self._pool_lock:
+            if self._pool_stopping:
+                return
+            if self._pool_filler is None:
+                self._pool_filler = threading.Thread(
+                    target=self._run_thread_pool, name="thread-pool", daemon=True
+                )
+                self._pool_filler.start()
+        self._pool_wanted.set()
+
+    def _stop_thread_pool(self) -> None:
+        """Stop the filler thread once it finished the refill in progress."""
+        with self._pool_lock:
+            self._pool_stopping = True
+            filler, self._pool_filler = self._pool_filler, None
+        self._pool_wanted.set()
+        if filler is not None:
+            filler.join()
+
+    def _claim_pooled_thread(self, userid: str) -> str | None:
+        """Assign a pooled thread to the user, None once the pool is empty.
+
+        Workers sharing the store load the same pooled threads, so a thread is
+        only used by the worker whose delete of its pool- key succeeds.
+        """
+        while True:
+            try:
+                thread_id = self._thread_pool.popleft()
+            except IndexError:
+                return None
+            with self.state.transaction():
+                if self.state.delete(self.name, "pool-" + thread_id):
+                    self.state.set(
+                        self.name, "thread-" + userid, thread_id, self.thread_ttl
+                    )
+                    return thread_id
+            logger.info(f"Pooled thread {thread_id} was taken by another worker")
+
+    def _assign_thread(self, userid: str) -> ThreadHandle:
+        """Give the user a fresh thread, from the pool when one is ready."""
+        thread_id = self._claim_pooled_thread(userid)
+        if thread_id is None:
+            thread_id = self.client.agents.threads.create().id
+            self.state.set(self.name, "thread-" + userid, thread_id, self.thread_ttl)
+        self._refill_thread_pool()
+        handle = ThreadHandle(thread_id)
+        self._threads.put(userid, handle)
+        return handle
+
+    def process_message(self, message: ThreadMessage | None) -> str:
         """
-        Process a list of messages and return their responses.
+        Process the content of a message and return the response text.
         """
-        text_messages: list[MessageTextContent] = messages.text_messages
-        data: list[ThreadMessage] = messages.data
-        message: ThreadMessage = data[0] if data else None
-        content: list[MessageContent] = message.content if message else None
+        content: list[MessageContent] = message.content if message else []
         response = ""
         for content_item in content:
             match content_item.type:
@@ -95,46 +209,122 @@ class AgentService:
                 case "image_file":
                     id = content_item.image_file.file_id
                     response += f"Generated File ID: {id}.png\n"
-                    self.client.agents.save_file(file_id=id, file_name=f"{id}.png")
+                    self.client.agents.files.save(file_id=id, file_name=f"{id}.png")
                     response += f"File saved as {id}.png\n"
                 case _:
                     return f"{str(content_item)}\n"
         return response
 
+    def _get_thread(self, userid: str) -> ThreadHandle:
+        """Get the user's thread, assigning one on the first message.
+
+        A known thread is not fetched remotely, its stored id is all the agent
+        calls need. _post_message replaces it if it turns out to be gone.
+        """
+        # Served by the store's read cache on most turns
+        thread_id = self.state.get(self.name, "thread-" + userid)
+        if thread_id and self.thread_ttl is not None:
+            # Only extends the expiry once half the TTL has passed; False means
+            # the mapping expired in the meantime
+            if not self.state.touch(
+                self.name, "thread-" + userid, self.thread_ttl, self.thread_ttl / 2
+            ):
+                thread_id = None
+        if not thread_id:
+            return self._assign_thread(userid)
+        return self._threads.current(userid, thread_id)
+
+    def _post_message(self, userid: str, prompt: str) -> ThreadHandle:
+        """Add the prompt to the user's thread and get the thread."""
+        thread = self._get_thread(userid)
+        try:
+            self.client.agents.messages.create(
+                thread_id=thread.id, role="user", content=prompt
+            )
+        except ResourceNotFoundError:
+            logger.warning(f"Thread {thread.id} of user {userid} is gone, replacing it")
+            thread = self._assign_thread(userid)
+            self.client.agents.messages.create(
+                thread_id=thread.id, role="user", content=prompt
+            )
+        return thread
+
     def process(self, userid: str, prompt: str) -> str:
         logger.info(f"Processing prompt for user {userid}: {prompt}")
 
-        thread = None
-        if self.state.exists(self.name, "thread-" + userid):
-            thread_id = self.state.get(self.name, "thread-" + userid)
-            thread = self.client.agents.get_thread(thread_id)
-        else:
-            thread = self.client.agents.create_thread()
-            self.state.set(self.name, "thread-" + userid, thread.id)
-
-        message = self.client.agents.create_message(
-            thread_id=thread.id, role="user", content=prompt
+        thread = self._post_message(userid, prompt)
+        run = self.client.agents.runs.create(
+            thread_id=thread.id, agent_id=self.agent.id
         )
+        run = self.poller.wait(
+            lambda: self.client.agents.runs.get(thread_id=thread.id, run_id=run.id),
+            lambda: self.client.agents.runs.cancel(thread_id=thread.id, run_id=run.id),
+            lambda run: (
+                self.tools_delegate(self.client, thread, run)
+                if self.tools_delegate
+                else None
+            ),
+        )
+        if run.status == "completed":
+            # Only the newest message of this run, so the call stays small and
+            # fast however long the thread grows
+            messages = self.client.agents.messages.list(
+                thread_id=thread.id, run_id=run.id, order="desc", limit=1
+            )
+            return self.process_message(next(iter(messages), None))
+        logger.error(f"Run {run.id} ended with status: {run.status}")
+        return ""
 
-        run = self.client.agents.create_run(thread_id=thread.id, agent_id=self.agent.id)
-        while True:
-            run = self.client.agents.get_run(thread_id=thread.id, run_id=run.id)
-            logger.info(f"Agent running with status: {run.status}")
-            if run.status == "completed":
-                messages = self.client.agents.list_messages(thread_id=thread.id)
-                return self.process_messages(messages)
-            if (
-                run.status == "expired"
-                or run.status == "failed"
-                or run.status == "cancelled"
-            ):
-                print("Run failed, expired or cancelled")
-                return ""
-            if run.status == "requires_action":
-                if self.tools_delegate:
-                    self.tools_delegate(self.client, thread, run)
-            sleep(0.5)
+    def process_stream(self, userid: str, prompt: str) -> Iterator[str]:
+        """Run the agent on a prompt and yield the response text as it arrives.
+
+        Uses the run event stream instead of polling. When the run needs tool
+        outputs they are computed with tool_outputs(run) and submitted with
+        the stream as event handler, so the events of the rest of the run
+        arrive on the same iteration.
+        """
+        logger.info(f"Streaming prompt for user {userid}: {prompt}")
+
+        thread = self._post_message(userid, prompt)
+
+        run = None
+        with self.client.agents.runs.stream(
+            thread_id=thread.id, agent_id=self.agent.id
+        ) as stream:
+            for event_type, event_data, _ in stream:
+                if isinstance(event_data, MessageDeltaChunk):
+                    if event_data.text:
+                        yield event_data.text
+                elif isinstance(event_data, ThreadRun):
+                    run = event_data
+                    if run.status == "requires_action" and isinstance(
+                        run.required_action, SubmitToolOutputsAction
+                    ):
+                        self._submit_tool_outputs_to_stream(thread, run, stream)
+                elif event_type == AgentStreamEvent.ERROR:
+                    logger.error(f"Stream error for user {userid}: {event_data}")
+        if run is None or run.status != "completed":
+            status = run.status if run else "unknown"
+            logger.error(f"Streamed run ended with status: {status}")
+
+    def _submit_tool_outputs_to_stream(self, thread, run: ThreadRun, stream) -> None:
+        if not self.tool_outputs:
+            logger.error(f"Run {run.id} requires tools but tool_outputs is not set")
+            self.client.agents.runs.cancel(thread_id=thread.id, run_id=run.id)
+            return
+        logger.info(f"Submitting tool outputs for run {run.id}")
+        self.client.agents.runs.submit_tool_outputs_stream(
+            thread_id=thread.id,
+            run_id=run.id,
+            tool_outputs=self.tool_outputs(run),
+            event_handler=stream,
+        )
 
     def clean_up(self):
         """Clean up the agent and its associated resources."""
-        agent_cleanup(self.client, self.name, self.agent.id)
+        self.state.stop_expiry_sweeper()
+        self._stop_thread_pool()
+        # Pooled threads are in the store and deleted with the rest
+        self._thread_pool.clear()
+        self._threads.clear()
+        agent_cleanup(self.client, self.name, self.agent.id, self.state)
@@ -0,0 +1,282 @@
+import asyncio
+from collections import deque
+
+from services.async_ckvstore_service import AsyncCategoryKeyValueStore
+from services.common import ThreadHandle, ThreadHandleCache, agent_cleanup_async
+from services.run_poller import RunPoller
+from services.settings_service import get_settings
+from services.kvstore_factory import create_store
+from services.logger_service import get_logger
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.ai.projects.aio import AIProjectClient
+from azure.identity.aio import DefaultAzureCredential
+from azure.ai.agents.models import Agent, ThreadMessage, ToolSet
+
+logger = get_logger(__name__)
+
+
+async_client_instance = None
+async_credential_instance = None
+
+
+def get_async_client_instance() -> AIProjectClient:
+    global async_client_instance, async_credential_instance
+    if not async_client_instance:
+        async_credential_instance = DefaultAzureCredential()
+        async_client_instance = AIProjectClient(
+            endpoint=get_settings().endpoint,
+            credential=async_credential_instance,
+        )
+    return async_client_instance
+
+
+async def close_async_client_instance() -> None:
+    """Close the shared async client and its credential, e.g. on server shutdown."""
+    global async_client_instance, async_credential_instance
+    if async_client_instance:
+        await async_client_instance.close()
+        await async_credential_instance.close()
+        async_client_instance = async_credential_instance = None
+
+
+class AsyncAgentService:
+    """AgentService for asyncio servers such as the FastAPI demo.
+
+    Every call to the agent service and to the store is awaited and runs are
+    polled with RunPoller.wait_async, so one worker serves many conversations
+    at once.
+
+    tools_delegate may be a plain function or a coroutine function, e.g.
+    tools.tools.async_tools_delegate.
+    """
+
+    def __init__(
+        self,
+        name: str = "full-agent-class",
+        description: str = "You are a general-purpose agent.",
+        instructions: str = "You are a helpful assistant.",
+        toolset: ToolSet | None = None,
+        tools_delegate=None,
+        thread_ttl: float | None = None,
+        poller: RunPoller | None = None,
+        thread_pool_size: int = 2,
+    ):
+        self.client: AIProjectClient | None = None
+        self.agent: Agent = None  # Placeholder for the agent object
+        # Same store layout as AgentService, with writes batched off the loop
+        self.state = AsyncCategoryKeyValueStore(
+            store=create_store(cache_size=4096, cache_ttl=300, codecs={name: "raw"})
+        )
+        self.name: str = name
+        self.description: str = description
+        self.instructions: str = instructions
+        self.toolset: ToolSet = toolset
+        self.tools_delegate = tools_delegate
+        # Idle user threads are forgotten (and deleted remotely) after this many seconds
+        self.thread_ttl: float | None = thread_ttl
+        self.poller: RunPoller = poller or RunPoller()
+        # Fresh threads created ahead of time, so new users skip threads.create.
+        # They are stored as "pool-<thread id>" so agent_cleanup_async deletes them.
+        self.thread_pool_size = thread_pool_size
+        self._thread_pool: deque[str] = deque()
+        self._threads = ThreadHandleCache()
+        self._pool_filler: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closing = False
+
+    async def create_or_reload_agent(self, agent_id: str | None = None) -> None:
+        """Create a new agent or recall an existing one."""
+        self.client = get_async_client_instance()
+        logger.info("Creating or retrieving recall agent...")
+        agent_id = agent_id or await self.state.get(self.name, "agentid")
+        if agent_id:
+            self.agent = await self.client.agents.get_agent(agent_id)
+        else:
+            self.agent = await self.client.agents.create_agent(
+                model="gpt-4o",
+                name=self.name,
+                description=self.description,
+                instructions=self.instructions,
+                temperature=0.1,
+                toolset=self.toolset,
+            )
+            await self.state.set(self.name, "agentid", self.agent.id)
+        if self.thread_ttl is not None:
+            self._loop = asyncio.get_running_loop()
+            self.state.store.start_expiry_sweeper(on_expire=self._on_key_expired)
+        # Threads pooled by an earlier run are still fresh
+        async for _, thread_id in self.state.iter_category(self.name, "pool-"):
+            self._thread_pool.append(thread_id)
+        self._refill_thread_pool()
+
+    def _on_key_expired(self, category: str, key: str, value) -> None:
+        """Delete the remote thread of an expired user thread mapping.
+
+        Runs on the sweeper thread, so the deletion is handed to the event loop.
+        It is not waited for once shutdown started, the loop may be busy
+        stopping the sweeper.
+        """
+        if category != self.name or not key.startswith("thread-"):
+            return
+        self._threads.discard(key[len("thread-") :])
+        logger.info(f"Deleting expired thread {value} for key: {key}")
+        deleted = asyncio.run_coroutine_threadsafe(
+            self.client.agents.threads.delete(value), self._loop
+        )
+        if not self._closing:
+            deleted.result(timeout=30)
+
+    async def reset_user_thread(self, userid: str) -> None:
+        """
+        Reset the thread for a specific user by removing the stored thread ID.
+        """
+        self._threads.discard(userid)
+        if not await self.state.delete(self.name, "thread-" + userid):
+            logger.warning(f"No thread found for user {userid} to reset.")
+
+        await self._assign_thread(userid)
+        logger.info(f"Thread for user {userid} has been reset.")
+
+    async def _fill_thread_pool(self) -> None:
+        try:
+            while len(self._thread_pool) < self.thread_pool_size:
+                thread = await self.client.agents.threads.create()
+                await self.state.set(self.name, "pool-" + thread.id, thread.id)
+                self._thread_pool.append(thread.id)
+        except Exception as e:
+            logger.exception(f"Error pre-creating threads: {e}")
+        finally:
+            self._pool_filler = None
+
+    def _refill_thread_pool(self) -> None:
+        """Top up the pool of fresh threads in the background."""
+        if self._pool_filler is None and self.thread_pool_size:
+            self._pool_filler = asyncio.create_task(self._fill_thread_pool())
+
+    async def _claim_pooled_thread(self, userid: str) -> str | None:
+        """Assign a pooled thread to the user, see AgentService._claim_pooled_thread."""
+        while self._thread_pool:
+            thread_id = self._thread_pool.popleft()
+
+            def claim(store) -> bool:
+                if not store.delete(self.name, "pool-" + thread_id):
+                    return False
+                store.set(self.name, "thread-" + userid, thread_id, self.thread_ttl)
+                return True
+
+            if await self.state.run_transaction(claim):
+                return thread_id
+            logger.info(f"Pooled thread {thread_id} was taken by another worker")
+        return None
+
+    async def _assign_thread(self, userid: str) -> ThreadHandle:
+        """Give the user a fresh thread, from the pool when one is ready."""
+        thread_id = await self._claim_pooled_thread(userid)
+        if thread_id is None:
+            thread_id = (await self.client.agents.threads.create()).id
+            await self.state.set(
+                self.name, "thread-" + userid, thread_id, self.thread_ttl
+            )
+        self._refill_thread_pool()
+        handle = ThreadHandle(thread_id)
+        self._threads.put(userid, handle)
+        return handle
+
+    async def _get_thread(self, userid: str) -> ThreadHandle:
+        """Get the user's thread without fetching it, see AgentService._get_thread."""
+        thread_id = await self.state.get(self.name, "thread-" + userid)
+        if thread_id and self.thread_ttl is not None:
+            if not await self.state.touch(
+                self.name, "thread-" + userid, self.thread_ttl, self.thread_ttl / 2
+            ):
+                thread_id = None
+        if not thread_id:
+            return await self._assign_thread(userid)
+        return self._threads.current(userid, thread_id)
+
+    async def _post_message(self, userid: str, prompt: str) -> ThreadHandle:
+        """Add the prompt to the user's thread and get the thread."""
+        thread = await self._get_thread(userid)
+        try:
+            await self.client.agents.messages.create(
+                thread_id=thread.id, role="user", content=prompt
+            )
+        except ResourceNotFoundError:
+            logger.warning(f"Thread {thread.id} of user {userid} is gone, replacing it")
+            thread = await self._assign_thread(userid)
+            await self.client.agents.messages.create(
+                thread_id=thread.id, role="user", content=prompt
+            )
+        return thread
+
+    async def process_message(self, message: ThreadMessage | None) -> str:
+        """
+        Process the content of a message and return the response text.
+        """
+        response = ""
+        for content_item in message.content if message else []:
+            match content_item.type:
+                case "text":
+                    response += f"{content_item.text.value}\n"
+                case "image_file":
+                    id = content_item.image_file.file_id
+                    response += f"Generated File ID: {id}.png\n"
+                    await self.client.agents.files.save(
+                        file_id=id, file_name=f"{id}.png"
+                    )
+                    response += f"File saved as {id}.png\n"
+                case _:
+                    return f"{str(content_item)}\n"
+        return response
+
+    async def process(self, userid: str, prompt: str) -> str:
+        logger.info(f"Processing prompt for user {userid}: {prompt}")
+
+        thread = await self._post_message(userid, prompt)
+        run = await self.client.agents.runs.create(
+            thread_id=thread.id, agent_id=self.agent.id
+        )
+        run = await self.poller.wait_async(
+            lambda: self.client.agents.runs.get(thread_id=thread.id, run_id=run.id),
+            lambda: self.client.agents.runs.cancel(thread_id=thread.id, run_id=run.id),
+            lambda run: (
+                self.tools_delegate(self.client, thread, run)
+                if self.tools_delegate
+                else None
+            ),
+        )
+        if run.status != "completed":
+            logger.error(f"Run {run.id} ended with status: {run.status}")
+            return ""
+        # Only the newest message of this run, like AgentService.process
+        async for message in self.client.agents.messages.list(
+            thread_id=thread.id, run_id=run.id, order="desc", limit=1
+        ):
+            return await self.process_message(message)
+        return ""
+
+    async def _stop(self) -> None:
+        """Stop the expiry sweeper, off the loop its callback may be waiting on."""
+        self._closing = True
+        await asyncio.to_thread(self.state.store.stop_expiry_sweeper)
+
+    async def clean_up(self):
+        """Clean up the agent and its associated resources."""
+        await self._stop()
+        if self._pool_filler is not None:
+            await self._pool_filler
+        # Pooled threads are in the store and deleted with the rest
+        self._thread_pool.clear()
+        self._threads.clear()
+        await agent_cleanup_async(self.client, self.name, self.agent.id, self.state)
+        await self.close()
+
+    async def close(self):
+        """Close the store and the client without deleting anything remotely."""
+        await self._stop()
+        if self._pool_filler is not None:
+            await self._pool_filler
+        await self.state.close()
+        await close_async_client_instance()
+        self.client = None
@@ -0,0 +1,242 @@
+import asyncio
+import queue
+import threading
+from itertools import islice
+from typing import (
+    Dict,
+    Any,
+    Optional,
+    List,
+    Iterable,
+    Callable,
+    TypeVar,
+    AsyncIterator,
+    Tuple,
+)
+
+from services.ckvstore_service import CategoryKeyValueStore
+from services.kvstore_base import KeyValueStoreBase
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+_STOP = object()
+
+
+class AsyncCategoryKeyValueStore:
+    """Awaitable wrapper around CategoryKeyValueStore or another store backend.
+
+    Reads run on the default executor against per-thread connections. Writes
+    are queued to one writer thread that commits whatever has accumulated
+    (up to max_batch operations) in a single transaction.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "./store.db",
+        max_batch: int = 256,
+        store: Optional[KeyValueStoreBase] = None,
+        **store_options,
+    ):
+        self.store: KeyValueStoreBase = store or CategoryKeyValueStore(
+            db_path, **store_options
+        )
+        self.max_batch = max_batch
+        self.batches = 0
+        self.batched_writes = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def _ensure_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="ckvstore-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        """Drain the queue and group-commit each batch of pending writes."""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: list) -> None:
+        results = []
+        try:
+            with self.store.transaction():
+                for fn, _, _ in batch:
+                    results.append(fn())
+        except Exception:
+            # One bad write must not fail its neighbours: retry each on its own
+            logger.exception("Group commit failed, retrying writes individually")
+            for fn, loop, future in batch:
+                try:
+                    with self.store.transaction():
+                        result = fn()
+                except Exception as e:
+                    self._resolve(loop, future, error=e)
+                else:
+                    self._resolve(loop, future, result=result)
+            return
+        self.batches += 1
+        self.batched_writes += len(batch)
+        for (_, loop, future), result in zip(batch, results):
+            self._resolve(loop, future, result=result)
+
+    @staticmethod
+    def _resolve(loop, future, result=None, error: Optional[Exception] = None):
+        def _set():
+            if future.cancelled():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        loop.call_soon_threadsafe(_set)
+
+    async def _submit_write(self, fn: Callable[[], T]) -> T:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_writer()
+        self._queue.put((fn, loop, future))
+        return await future
+
+    async def set(
+        self, category: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """Set a value for a given category and key, optionally expiring after ttl seconds."""
+        await self._submit_write(lambda: self.store.set(category, key, value, ttl))
+
+    async def set_many(
+        self, category: str, items: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        """Set several keys in a category."""
+        items = dict(items)
+        await self._submit_write(lambda: self.store.set_many(category, items, ttl))
+
+    async def touch(
+        self,
+        category: str,
+        key: str,
+        ttl: Optional[float],
+        min_remaining: Optional[float] = None,
+    ) -> bool:
+        """Reset the expiry of a key. Returns False if the key does not exist."""
+        return await self._submit_write(
+            lambda: self.store.touch(category, key, ttl, min_remaining)
+        )
+
+    async def delete(self, category: str, key: str) -> bool:
+        """Delete a key from a category. Returns True if deleted, False if not found."""
+        return await self._submit_write(lambda: self.store.delete(category, key))
+
+    async def delete_many(self, category: str, keys: Iterable[str]) -> int:
+        """Delete several keys from a category. Returns the number deleted."""
+        keys = list(keys)
+        return await self._submit_write(lambda: self.store.delete_many(category, keys))
+
+    async def delete_category(self, category: str) -> bool:
+        """Delete an entire category. Returns True if deleted, False if not found."""
+        return await self._submit_write(lambda: self.store.delete_category(category))
+
+    async def clear(self) -> None:
+        """Clear all data from the store."""
+        await self._submit_write(self.store.clear)
+
+    async def run_transaction(self, fn: Callable[[KeyValueStoreBase], T]) -> T:
+        """Run fn(store) on the writer thread inside one transaction."""
+        return await self._submit_write(lambda: fn(self.store))
+
+    async def get(self, category: str, key: str) -> Optional[Any]:
+        """Get a value for a given category and key."""
+        return await asyncio.to_thread(self.store.get, category, key)
+
+    async def get_many(self, category: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several keys from a category."""
+        return await asyncio.to_thread(self.store.get_many, category, list(keys))
+
+    async def get_category(self, category: str) -> Dict[str, Any]:
+        """Get all key-value pairs in a category."""
+        return await asyncio.to_thread(self.store.get_category, category)
+
+    async def iter_category(
+        self, category: str, prefix: Optional[str] = None, batch_size: int = 500
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs of a category, fetching one page per executor call."""
+        items = self.store.iter_category(category, prefix, batch_size)
+        while True:
+            page = await asyncio.to_thread(lambda: list(islice(items, batch_size)))
+            for item in page:
+                yield item
+            if len(page) < batch_size:
+                return
+
+    async def get_categories(self) -> List[str]:
+        """Get all category names."""
+        return await asyncio.to_thread(self.store.get_categories)
+
+    async def exists(self, category: str, key: Optional[str] = None) -> bool:
+        """Check if a category or category/key combination exists."""
+        return await asyncio.to_thread(self.store.exists, category, key)
+
+    async def size(self, category: Optional[str] = None) -> int:
+        """Get the number of keys in a category or total number of categories."""
+        return await asyncio.to_thread(self.store.size, category)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get read cache counters of the underlying store."""
+        return self.store.cache_stats()
+
+    def write_stats(self) -> Dict[str, int]:
+        """Get the number of group commits and the writes they contained."""
+        return {
+            "batches": self.batches,
+            "writes": self.batched_writes,
+            "queued": self._queue.qsize(),
+        }
+
+    async def close(self) -> None:
+        """Flush pending writes, stop the writer thread and close the store."""
+        logger.info("Closing async key-value store")
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self._queue.put(_STOP)
+            await asyncio.to_thread(writer.join)
+        self.store.close()
+
+
+# Example usage
+if __name__ == "__main__":
+
+    async def main():
+        store = AsyncCategoryKeyValueStore()
+        await asyncio.gather(
+            *(store.set("users", f"user{i}", {"id": i}) for i in range(100))
+        )
+        print(await store.get("users", "user1"))  # {'id': 1}
+        print(await store.size("users"))  # 100
+        print(store.write_stats())
+        await store.delete_category("users")
+        await store.close()
+
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+import math
+import re
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+
+# Words too common to say anything about a chunk, left out of the index
+STOPWORDS = frozenset(
+    """a about after all also an and any are as at be been but by can do does
+    for from had has have how i if in into is it its me my no not of on or our
+    so than that the their them then there these they this to up us was we
+    were what when where which who why will with would you your""".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens, the unit the lexical index matches on."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index ranking chunks by Okapi BM25, with no embedding calls.
+
+    Rows line up with the rows of the VectorIndex built from the same chunks,
+    so the two stay in sync through add() and remove(). Each term keeps a
+    postings map of row -> term frequency; a query only touches the postings
+    of its own terms. Stopwords are dropped from chunks and queries alike.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[str] = (),
+        k1: float = 1.5,
+        b: float = 0.75,
+        stopwords: Iterable[str] = STOPWORDS,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.stopwords = frozenset(stopwords)
+        self.chunks: list[str] = []
+        self._terms: list[Counter] = []  # term frequencies per row
+        self._lengths: list[int] = []
+        self._postings: dict[str, dict[int, int]] = {}
+        # Per-term (rows, frequencies) arrays, rebuilt lazily after changes
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._total_length = 0
+        self._norm: np.ndarray | None = None  # length normalization per row
+        self.add(chunks)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _tokens(self, text: str) -> list[str]:
+        return [token for token in tokenize(text) if token not in self.stopwords]
+
+    def add(self, chunks: Iterable[str]) -> None:
+        """Index chunks as new rows at the end."""
+        for chunk in chunks:
+            row = len(self.chunks)
+            terms = Counter(self._tokens(chunk))
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[row] = frequency
+                self._arrays.pop(term, None)
+            self.chunks.append(chunk)
+            self._terms.append(terms)
+            self._lengths.append(sum(terms.values()))
+            self._total_length += self._lengths[-1]
+            self._norm = None
+
+    def remove(self, rows) -> int:
+        """Remove rows by position, renumbering the rest like VectorIndex.remove."""
+        removed = set(rows)
+        if not removed:
+            return 0
+        kept = [row for row in range(len(self.chunks)) if row not in removed]
+        self.chunks = [self.chunks[row] for row in kept]
+        self._terms = [self._terms[row] for row in kept]
+        self._lengths = [self._lengths[row] for row in kept]
+        self._total_length = sum(self._lengths)
+        # Renumber the postings without tokenizing the chunks again
+        self._postings = {}
+        for row, terms in enumerate(self._terms):
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[row] = frequency
+        self._arrays = {}
+        self._norm = None
+        return len(removed)
+
+    def _term_arrays(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term, {})
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for query, zero for rows sharing no term."""
+        count = len(self.chunks)
+        scores = np.zeros(count, dtype=np.float32)
+        if count == 0:
+            return scores
+        if self._norm is None:
+            lengths = np.asarray(self._lengths, dtype=np.float32)
+            average = max(self._total_length / count, 1.0)
+            self._norm = self.k1 * (1 - self.b + self.b * lengths / average)
+        for term in set(self._tokens(query)):
+            rows, frequencies = self._term_arrays(term)
+            if len(rows) == 0:
+                continue
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += (
+                idf * frequencies * (self.k1 + 1) / (frequencies + self._norm[rows])
+            )
+        return scores
+
+    def search(self, query: str, limit: int = 2, min_score: float = 0.0) -> list:
+        """Return up to limit (chunk, score) pairs scoring above min_score."""
+        scores = self.scores(query)
+        if limit <= 0 or not scores.any():
+            return []
+        limit = min(limit, len(scores))
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            (self.chunks[i], float(scores[i])) for i in best if scores[i] > min_score
+        ]
@@ -1,121 +1,520 @@
 import threading
 import sqlite3
-import json
-from typing import Dict, Any, Optional, List
+import copy
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Iterator, Callable
 
+from services.kvstore_base import KeyValueStoreBase
+from services.kvstore_codecs import CODECS, encode_value, decode_value
 from services.logger_service import get_logger
 
 logger = get_logger(__name__)
 
+# Stay well below SQLite's default limit on bound parameters per statement
+_MAX_BATCH_PARAMS = 500
 
-class CategoryKeyValueStore:
-    def __init__(self, db_path: str = "./store.db"):
+# Rows whose expiry has passed are invisible to reads even before they are purged
+_LIVE = "(expires_at IS NULL OR expires_at > ?)"
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with prefix.
+
+    Lets a prefix match run as a range scan on the (category, key) primary key.
+    Returns None when no such bound exists (prefix made of max code points).
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code == 0xD800:
+            code = 0xE000  # skip surrogates, SQLite stores keys as UTF-8
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
+
+class _ReadCache:
+    """Bounded LRU cache with optional TTL for decoded store values."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # (category, key) -> (value, fresh until on the monotonic clock or 0.0,
+        # wall-clock expiry of the stored row or None)
+        self._items: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a reader that queried SQLite before a
+        # concurrent write cannot put the stale value back into the cache.
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, category: str, key: str) -> Tuple[bool, Any]:
+        """Return (found, value) and update the hit/miss counters."""
+        with self._lock:
+            entry = self._items.get((category, key))
+            if entry is not None:
+                value, fresh_until, expires_at = entry
+                if (not fresh_until or fresh_until > time.monotonic()) and (
+                    expires_at is None or expires_at > time.time()
+                ):
+                    self._items.move_to_end((category, key))
+                    self.hits += 1
+                    if isinstance(value, (dict, list)):
+                        value = copy.deepcopy(value)
+                    return True, value
+                del self._items[(category, key)]
+            self.misses += 1
+            return False, None
+
+    def put(
+        self,
+        category: str,
+        key: str,
+        value: Any,
+        generation: int,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """Cache a value read at `generation` from a row expiring at expires_at."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            fresh_until = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+            if isinstance(value, (dict, list)):
+                value = copy.deepcopy(value)
+            self._items[(category, key)] = (value, fresh_until, expires_at)
+            self._items.move_to_end((category, key))
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def expiry(self, category: str, key: str) -> Tuple[bool, Optional[float]]:
+        """Return (found, expiry of the row) of a cached key, without counting a hit."""
+        with self._lock:
+            entry = self._items.get((category, key))
+            if entry is None or (entry[2] is not None and entry[2] <= time.time()):
+                return False, None
+            return True, entry[2]
+
+    def retime(self, category: str, key: str, expires_at: Optional[float]) -> None:
+        """Move the row expiry of a cached key, which keeps its value and freshness."""
+        with self._lock:
+            entry = self._items.get((category, key))
+            if entry is not None:
+                self._items[(category, key)] = (entry[0], entry[1], expires_at)
+
+    def invalidate(self, category: Optional[str] = None, key: Optional[str] = None):
+        """Drop one key, a whole category, or everything when both are None."""
+        with self._lock:
+            self._generation += 1
+            if category is None:
+                self._items.clear()
+            elif key is not None:
+                self._items.pop((category, key), None)
+            else:
+                for item in [k for k in self._items if k[0] == category]:
+                    del self._items[item]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "max_size": self.max_size,
+            }
+
+
+class _ConnectionHolder:
+    """Thread-local home of a connection; it is collected when its thread exits."""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_connection(
+    conn: sqlite3.Connection,
+    connections: List[sqlite3.Connection],
+    lock: threading.RLock,
+) -> None:
+    """Close the connection of a thread that exited and forget it."""
+    with lock:
+        if conn in connections:
+            connections.remove(conn)
+    conn.close()
+
+
+class CategoryKeyValueStore(KeyValueStoreBase):
+    def __init__(
+        self,
+        db_path: str = "./store.db",
+        synchronous: str = "NORMAL",
+        cache_size_kb: int = 8192,
+        busy_timeout_ms: int = 5000,
+        cache_size: int = 0,
+        cache_ttl: Optional[float] = None,
+        codecs: Optional[Dict[str, str]] = None,
+        default_codec: str = "json",
+        compress_threshold: Optional[int] = None,
+    ):
         self.db_path = db_path
+        self.synchronous = synchronous
+        self.cache_size_kb = cache_size_kb
+        self.busy_timeout_ms = busy_timeout_ms
+        # Value codec per category (json, raw or bin). Each row records the codec
+        # it was written with, so changing it never breaks reading older rows.
+        self.default_codec = default_codec
+        self.compress_threshold = compress_threshold
+        self._codecs: Dict[str, str] = {}
+        for category, codec in (codecs or {}).items():
+            self.set_codec(category, codec)
+        # Writers serialize on this lock. Readers use their own connection and
+        # rely on WAL snapshots instead of taking it.
         self._lock = threading.RLock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        # Reentrant: dropping a thread-local holder may release a connection
+        # while the lock is held
+        self._connections_lock = threading.RLock()
+        # Optional read-through cache, disabled when cache_size is 0
+        self._cache: Optional[_ReadCache] = (
+            _ReadCache(cache_size, cache_ttl) if cache_size > 0 else None
+        )
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Get the long-lived connection for the calling thread, opening it on first use.
+
+        The connection is closed when the thread exits, so short-lived threads
+        do not pile up open connections.
+        """
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout_ms / 1000,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            conn.execute(f"PRAGMA cache_size=-{self.cache_size_kb}")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            holder = _ConnectionHolder(conn)
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.append(conn)
+            weakref.finalize(
+                holder,
+                _release_connection,
+                conn,
+                self._connections,
+                self._connections_lock,
+            )
+        return holder.conn
+
     def _init_db(self):
         """Initialize the database and create table if it doesn't exist."""
         with self._lock:
             logger.info(f"Initializing database at {self.db_path}")
-            with sqlite3.connect(self.db_path) as conn:
+            conn = self._connect()
+            with conn:
                 conn.execute(
                     """
                     CREATE TABLE IF NOT EXISTS store (
                         category TEXT NOT NULL,
                         key TEXT NOT NULL,
                         value TEXT NOT NULL,
+                        expires_at REAL,
+                        codec TEXT,
                         PRIMARY KEY (category, key)
                     )
                 """
                 )
-                conn.commit()
-
-    def set(self, category: str, key: str, value: Any) -> None:
-        """Set a value for a given category and key."""
-        logger.info(f"Setting value for category '{category}', key '{key}'")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(store)")]
+                if "expires_at" not in columns:
+                    # Stores created before key expiry was added
+                    conn.execute("ALTER TABLE store ADD COLUMN expires_at REAL")
+                if "codec" not in columns:
+                    # Stores created before value codecs were added hold JSON
+                    conn.execute("ALTER TABLE store ADD COLUMN codec TEXT")
                 conn.execute(
                     """
-                    INSERT OR REPLACE INTO store (category, key, value)
-                    VALUES (?, ?, ?)
-                """,
-                    (category, key, json.dumps(value)),
+                    CREATE INDEX IF NOT EXISTS store_expires_at
+                    ON store (expires_at) WHERE expires_at IS NOT NULL
+                """
                 )
-                conn.commit()
+
+    def close(self) -> None:
+        """Stop the expiry sweeper and close every connection opened by the store."""
+        logger.info(f"Closing connections to {self.db_path}")
+        self.stop_expiry_sweeper()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
+
+    def set_codec(self, category: str, codec: str) -> None:
+        """Choose how new values in a category are encoded: json, raw or bin."""
+        if codec not in CODECS:
+            raise ValueError(f"Unknown value codec: {codec}")
+        self._codecs[category] = codec
+
+    def _encode(self, category: str, value: Any) -> Tuple[Any, str]:
+        codec = self._codecs.get(category, self.default_codec)
+        return encode_value(value, codec, self.compress_threshold)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Hold the write lock and commit on exit, or join the open transaction."""
+        with self._lock:
+            conn = self._connect()
+            if getattr(self._local, "pending", None) is not None:
+                yield conn
+                return
+            self._local.pending = []
+            try:
+                with conn:
+                    yield conn
+            finally:
+                pending = self._local.pending
+                self._local.pending = None
+                # Readers may have cached pre-commit values in the meantime
+                for category, key in pending:
+                    self._cache.invalidate(category, key)
+
+    def _invalidate(self, category: Optional[str] = None, key: Optional[str] = None):
+        """Drop cached entries now and again once the current write commits."""
+        if not self._cache:
+            return
+        self._cache.invalidate(category, key)
+        self._local.pending.append((category, key))
+
+    @contextmanager
+    def transaction(self) -> Iterator["CategoryKeyValueStore"]:
+        """Group writes made inside the block into a single commit.
+
+        Rolls back if the block raises. Nested calls join the outer transaction.
+        """
+        with self._write():
+            yield self
+
+    def set(
+        self, category: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """Set a value for a given category and key, optionally expiring after ttl seconds."""
+        logger.info(f"Setting value for category '{category}', key '{key}'")
+        expires_at = time.time() + ttl if ttl is not None else None
+        data, codec = self._encode(category, value)
+        with self._write() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO store (category, key, value, expires_at, codec)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (category, key, data, expires_at, codec),
+            )
+            self._invalidate(category, key)
+
+    def set_many(
+        self, category: str, items: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        """Set several keys in a category with a single commit."""
+        logger.info(f"Setting {len(items)} values for category '{category}'")
+        expires_at = time.time() + ttl if ttl is not None else None
+        rows = [
+            (category, key, *self._encode(category, value))
+            for key, value in items.items()
+        ]
+        with self._write() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO store (category, key, value, codec, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                [row + (expires_at,) for row in rows],
+            )
+            for key in items:
+                self._invalidate(category, key)
 
     def get(self, category: str, key: str) -> Optional[Any]:
         """Get a value for a given category and key."""
         logger.info(f"Getting value for category '{category}', key '{key}'")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    """
-                    SELECT value FROM store
-                    WHERE category = ? AND key = ?
-                """,
-                    (category, key),
-                )
-                row = cursor.fetchone()
-                return json.loads(row[0]) if row else None
+        if self._cache:
+            found, value = self._cache.get(category, key)
+            if found:
+                return value
+            generation = self._cache.generation
+        now = time.time()
+        cursor = self._connect().execute(
+            f"""
+            SELECT value, codec, expires_at FROM store
+            WHERE category = ? AND key = ? AND {_LIVE}
+        """,
+            (category, key, now),
+        )
+        row = cursor.fetchone()
+        value = decode_value(row[0], row[1]) if row else None
+        if self._cache and row:
+            self._cache.put(category, key, value, generation, row[2])
+        return value
+
+    def get_many(self, category: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several keys from a category. Missing keys are left out of the result."""
+        keys = list(dict.fromkeys(keys))
+        logger.info(f"Getting {len(keys)} values for category '{category}'")
+        results: Dict[str, Any] = {}
+        pending = keys
+        if self._cache:
+            pending = []
+            for key in keys:
+                found, value = self._cache.get(category, key)
+                if found:
+                    results[key] = value
+                else:
+                    pending.append(key)
+            generation = self._cache.generation
+        conn = self._connect()
+        now = time.time()
+        for start in range(0, len(pending), _MAX_BATCH_PARAMS):
+            batch = pending[start : start + _MAX_BATCH_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            cursor = conn.execute(
+                f"""
+                SELECT key, value, codec, expires_at FROM store
+                WHERE category = ? AND key IN ({placeholders}) AND {_LIVE}
+            """,
+                (category, *batch, now),
+            )
+            for key, data, codec, expires_at in cursor.fetchall():
+                results[key] = decode_value(data, codec)
+                if self._cache:
+                    self._cache.put(category, key, results[key], generation, expires_at)
+        return results
 
     def delete(self, category: str, key: str) -> bool:
         """Delete a key from a category. Returns True if deleted, False if not found."""
         logger.info(f"Deleting key '{key}' from category '{category}'")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
+        with self._write() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM store
+                WHERE category = ? AND key = ?
+            """,
+                (category, key),
+            )
+            self._invalidate(category, key)
+            return cursor.rowcount > 0
+
+    def delete_many(self, category: str, keys: Iterable[str]) -> int:
+        """Delete several keys from a category with a single commit. Returns the number deleted."""
+        keys = list(dict.fromkeys(keys))
+        logger.info(f"Deleting {len(keys)} keys from category '{category}'")
+        deleted = 0
+        with self._write() as conn:
+            for start in range(0, len(keys), _MAX_BATCH_PARAMS):
+                batch = keys[start : start + _MAX_BATCH_PARAMS]
+                placeholders = ",".join("?" * len(batch))
                 cursor = conn.execute(
-                    """
+                    f"""
                     DELETE FROM store
-                    WHERE category = ? AND key = ?
+                    WHERE category = ? AND key IN ({placeholders})
                 """,
-                    (category, key),
+                    (category, *batch),
                 )
-                conn.commit()
-                return cursor.rowcount > 0
+                deleted += cursor.rowcount
+            for key in keys:
+                self._invalidate(category, key)
+        return deleted
 
     def delete_category(self, category: str) -> bool:
         """Delete an entire category. Returns True if deleted, False if not found."""
         logger.info(f"Deleting category '{category}'")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    """
-                    DELETE FROM store
-                    WHERE category = ?
-                """,
-                    (category,),
-                )
-                conn.commit()
-                return cursor.rowcount > 0
+        with self._write() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM store
+                WHERE category = ?
+            """,
+                (category,),
+            )
+            self._invalidate(category)
+            return cursor.rowcount > 0
 
     def get_category(self, category: str) -> Dict[str, Any]:
         """Get all key-value pairs in a category."""
         logger.info(f"Getting all items in category '{category}'")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    """
-                    SELECT key, value FROM store
-                    WHERE category = ?
-                """,
-                    (category,),
-                )
-                return {row[0]: json.loads(row[1]) for row in cursor.fetchall()}
+        cursor = self._connect().execute(
+            f"""
+            SELECT key, value, codec FROM store
+            WHERE category = ? AND {_LIVE}
+        """,
+            (category, time.time()),
+        )
+        return {row[0]: decode_value(row[1], row[2]) for row in cursor.fetchall()}
+
+    def iter_category(
+        self, category: str, prefix: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs of a category in key order, one page at a time.
+
+        Pages are fetched with keyset pagination on the primary key, so memory
+        stays bounded and no lock or read transaction is held between pages.
+        Values are decoded as they are yielded.
+        """
+        logger.info(
+            f"Iterating items in category '{category}'"
+            + (f" with prefix '{prefix}'" if prefix else "")
+        )
+        lower = prefix or ""
+        upper = _prefix_upper_bound(prefix) if prefix else None
+        inclusive = True
+        while True:
+            conditions = ["category = ?", "key >= ?" if inclusive else "key > ?"]
+            params: List[Any] = [category, lower]
+            if upper is not None:
+                conditions.append("key < ?")
+                params.append(upper)
+            conditions.append(_LIVE)
+            params.extend([time.time(), batch_size])
+            where = " AND ".join(conditions)
+            cursor = self._connect().execute(
+                f"""
+                SELECT key, value, codec FROM store
+                WHERE {where}
+                ORDER BY key
+                LIMIT ?
+            """,
+                params,
+            )
+            rows = cursor.fetchall()
+            for key, data, codec in rows:
+                yield key, decode_value(data, codec)
+            if len(rows) < batch_size:
+                return
+            lower, inclusive = rows[-1][0], False
 
     def get_categories(self) -> List[str]:
         """Get all category names."""
         logger.info("Getting all categories")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    """
-                    SELECT DISTINCT category FROM store
-                    ORDER BY category
-                """
-                )
-                return [row[0] for row in cursor.fetchall()]
+        cursor = self._connect().execute(
+            f"""
+            SELECT DISTINCT category FROM store
+            WHERE {_LIVE}
+            ORDER BY category
+        """,
+            (time.time(),),
+        )
+        return [row[0] for row in cursor.fetchall()]
 
     def exists(self, category: str, key: Optional[str] = None) -> bool:
         """Check if a category or category/key combination exists."""
@@ -123,35 +522,37 @@ class CategoryKeyValueStore:
             f"Checking existence for category '{category}'"
             + (f", key '{key}'" if key else "")
         )
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                if key is None:
-                    cursor = conn.execute(
-                        """
-                        SELECT 1 FROM store
-                        WHERE category = ?
-                        LIMIT 1
-                    """,
-                        (category,),
-                    )
-                else:
-                    cursor = conn.execute(
-                        """
-                        SELECT 1 FROM store
-                        WHERE category = ? AND key = ?
-                        LIMIT 1
-                    """,
-                        (category, key),
-                    )
-                return cursor.fetchone() is not None
+        if self._cache and key is not None:
+            found, _ = self._cache.get(category, key)
+            if found:
+                return True
+        conn = self._connect()
+        if key is None:
+            cursor = conn.execute(
+                f"""
+                SELECT 1 FROM store
+                WHERE category = ? AND {_LIVE}
+                LIMIT 1
+            """,
+                (category, time.time()),
+            )
+        else:
+            cursor = conn.execute(
+                f"""
+                SELECT 1 FROM store
+                WHERE category = ? AND key = ? AND {_LIVE}
+                LIMIT 1
+            """,
+                (category, key, time.time()),
+            )
+        return cursor.fetchone() is not None
 
     def clear(self) -> None:
         """Clear all data from the store."""
         logger.info("Clearing all data from the store")
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("DELETE FROM store")
-                conn.commit()
+        with self._write() as conn:
+            conn.execute("DELETE FROM store")
+            self._invalidate()
 
     def size(self, category: Optional[str] = None) -> int:
         """Get the number of keys in a category or total number of categories."""
@@ -160,23 +561,110 @@ class CategoryKeyValueStore:
             if category
             else "Getting total number of categories"
         )
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                if category is None:
-                    cursor = conn.execute(
-                        """
-                        SELECT COUNT(DISTINCT category) FROM store
-                    """
-                    )
-                else:
-                    cursor = conn.execute(
-                        """
-                        SELECT COUNT(*) FROM store
-                        WHERE category = ?
-                    """,
-                        (category,),
-                    )
-                return cursor.fetchone()[0]
+        conn = self._connect()
+        if category is None:
+            cursor = conn.execute(
+                f"""
+                SELECT COUNT(DISTINCT category) FROM store
+                WHERE {_LIVE}
+            """,
+                (time.time(),),
+            )
+        else:
+            cursor = conn.execute(
+                f"""
+                SELECT COUNT(*) FROM store
+                WHERE category = ? AND {_LIVE}
+            """,
+                (category, time.time()),
+            )
+        return cursor.fetchone()[0]
+
+    def touch(
+        self,
+        category: str,
+        key: str,
+        ttl: Optional[float],
+        min_remaining: Optional[float] = None,
+    ) -> bool:
+        """Reset the expiry of a live key. Returns False if the key does not exist.
+
+        With min_remaining, a key with more than that many seconds left to live
+        is left as it is, so touching a key on every read rarely writes. The
+        cached value stays cached, only its expiry moves.
+        """
+        now = time.time()
+        if min_remaining is not None:
+            found, current = False, None
+            if self._cache:
+                found, current = self._cache.expiry(category, key)
+            if not found:
+                row = self._connect().execute(
+                    f"""
+                    SELECT expires_at FROM store
+                    WHERE category = ? AND key = ? AND {_LIVE}
+                """,
+                    (category, key, now),
+                ).fetchone()
+                if row is None:
+                    return False
+                current = row[0]
+            if current is not None and current - now > min_remaining:
+                return True
+        expires_at = now + ttl if ttl is not None else None
+        with self._write() as conn:
+            cursor = conn.execute(
+                f"""
+                UPDATE store SET expires_at = ?
+                WHERE category = ? AND key = ? AND {_LIVE}
+            """,
+                (expires_at, category, key, now),
+            )
+            if self._cache:
+                self._cache.retime(category, key, expires_at)
+            return cursor.rowcount > 0
+
+    def purge_expired(
+        self,
+        batch_size: int = 500,
+        on_expire: Optional[Callable[[str, str, Any], None]] = None,
+    ) -> int:
+        """Delete up to batch_size expired keys. Returns the number purged.
+
+        on_expire(category, key, value) is called for each purged key after the
+        delete commits, outside the write lock, so it may do slow remote calls.
+        """
+        with self._write() as conn:
+            rows = conn.execute(
+                """
+                DELETE FROM store
+                WHERE rowid IN (
+                    SELECT rowid FROM store
+                    WHERE expires_at <= ?
+                    ORDER BY expires_at
+                    LIMIT ?
+                )
+                RETURNING category, key, value, codec
+            """,
+                (time.time(), batch_size),
+            ).fetchall()
+            for category, key, _, _ in rows:
+                self._invalidate(category, key)
+        if rows:
+            logger.info(f"Purged {len(rows)} expired keys from {self.db_path}")
+        if on_expire:
+            for category, key, data, codec in rows:
+                try:
+                    on_expire(category, key, decode_value(data, codec))
+                except Exception as e:
+                    logger.exception(f"Error handling expired key '{key}': {e}")
+        return len(rows)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and occupancy of the read cache."""
+        if not self._cache:
+            return {"hits": 0, "misses": 0, "size": 0, "max_size": 0}
+        return self._cache.stats()
 
 
 # Example usage
@@ -1,10 +1,69 @@
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, Optional, Tuple
+
 from azure.ai.projects import AIProjectClient
+from azure.ai.projects.aio import AIProjectClient as AsyncAIProjectClient
 from azure.ai.agents.models import FilePurpose
-from services.ckvstore_service import CategoryKeyValueStore
+from services.async_ckvstore_service import AsyncCategoryKeyValueStore
+from services.kvstore_base import KeyValueStoreBase
+from services.kvstore_factory import create_store
 from services.logger_service import get_logger
 
 logger = get_logger(__name__)
-store = CategoryKeyValueStore()
+store = create_store()
+
+
+class ThreadHandle:
+    """Stands in for a thread object, the agent calls only need its id."""
+
+    def __init__(self, id: str):
+        self.id = id
+
+
+class ThreadHandleCache:
+    """Recently used thread handles by user id.
+
+    A handle is only reused while the store still maps the user to its thread,
+    see current(), so a reset or expiry in another worker is picked up. Safe
+    to use from the expiry sweeper thread.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._handles: "OrderedDict[str, ThreadHandle]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, userid: str) -> Optional[ThreadHandle]:
+        with self._lock:
+            handle = self._handles.get(userid)
+            if handle is not None:
+                self._handles.move_to_end(userid)
+            return handle
+
+    def put(self, userid: str, handle: ThreadHandle) -> None:
+        with self._lock:
+            self._handles[userid] = handle
+            self._handles.move_to_end(userid)
+            while len(self._handles) > self.max_entries:
+                self._handles.popitem(last=False)
+
+    def current(self, userid: str, thread_id: str) -> ThreadHandle:
+        """Get the handle of the thread the store maps the user to."""
+        handle = self.get(userid)
+        if handle is None or handle.id != thread_id:
+            handle = ThreadHandle(thread_id)
+            self.put(userid, handle)
+        return handle
+
+    def discard(self, userid: str) -> None:
+        with self._lock:
+            self._handles.pop(userid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handles.clear()
 
 
 def get_openai_file(client: AIProjectClient, file_path: str) -> any:  # OpenAI file
@@ -27,42 +86,88 @@ def get_openai_file(client: AIProjectClient, file_path: str) -> any:  # OpenAI f
         return None
 
 
-def agent_cleanup(client: AIProjectClient, category: str, agent_id: str) -> None:
+def _cleanup_call(client, key: str, value: str) -> Optional[Tuple[str, Callable]]:
+    """What to delete for a stored key of an agent category, and how."""
+    if key.startswith("thread-") or key.startswith("pool-"):
+        return f"thread {value}", lambda: client.agents.threads.delete(value)
+    if key.startswith("file-"):
+        return f"file {value}", lambda: client.agents.files.delete(value)
+    if key == "agentid":
+        return f"agent {value}", lambda: client.agents.delete_agent(value)
+    return None
+
+
+def _forget(store: KeyValueStoreBase, category: str, deleted_keys: list) -> None:
+    """Remove the keys of deleted resources and then the whole category."""
+    logger.info(f"Deleting category: {category}")
+    with store.transaction():
+        store.delete_many(category, deleted_keys)
+        store.delete_category(category)
+
+
+def agent_cleanup(
+    client: AIProjectClient,
+    category: str,
+    agent_id: str,
+    state: Optional[KeyValueStoreBase] = None,
+) -> None:
     """Cleans up the agent and its associated resources in the specified category.
 
     Args:
         client: The OpenAI client instance.
         category: The category under which the agent and resources are stored.
         agent_id: The ID of the agent to be deleted.
+        state: The store holding the category, the shared module store by default.
     """
     logger.info(f"Starting cleanup for category: {category}, agent_id: {agent_id}")
-    items = store.get_category(category)
-    if items:
-        for key in items.keys():
-            if key.startswith("thread-"):
-                logger.info(f"Deleting thread for key: {key}")
-                thread_id = items[key]
-                try:
-                    client.agents.threads.delete(thread_id)
-                    store.delete(category, key)
-                except Exception as e:
-                    logger.exception(f"Error deleting thread {thread_id}: {e}")
-            if key.startswith("file-"):
-                logger.info(f"Deleting file for key: {key}")
-                file_id = items[key]
-                try:
-                    client.agents.files.delete(file_id)
-                    store.delete(category, key)
-                except Exception as e:
-                    logger.exception(f"Error deleting file {file_id}: {e}")
+    state = state or store
+    items = chain(
+        state.iter_category(category, prefix="thread-"),
+        state.iter_category(category, prefix="pool-"),
+        state.iter_category(category, prefix="file-"),
+        [("agentid", agent_id)] if agent_id else [],
+    )
+    deleted_keys = []
+    for key, value in items:
+        description, delete = _cleanup_call(client, key, value)
+        logger.info(f"Deleting {description} for key: {key}")
+        try:
+            delete()
+            deleted_keys.append(key)
+        except Exception as e:
+            logger.exception(f"Error deleting {description}: {e}")
+    _forget(state, category, deleted_keys)
+
+
+async def agent_cleanup_async(
+    client: AsyncAIProjectClient,
+    category: str,
+    agent_id: str,
+    state: AsyncCategoryKeyValueStore,
+) -> None:
+    """Cleans up the agent and its resources like agent_cleanup, with the async client.
 
+    Args:
+        client: The async project client instance.
+        category: The category under which the agent and resources are stored.
+        agent_id: The ID of the agent to be deleted.
+        state: The async store holding the category.
+    """
+    logger.info(f"Starting cleanup for category: {category}, agent_id: {agent_id}")
+    items = [
+        item
+        for prefix in ("thread-", "pool-", "file-")
+        async for item in state.iter_category(category, prefix=prefix)
+    ]
     if agent_id:
+        items.append(("agentid", agent_id))
+    deleted_keys = []
+    for key, value in items:
+        description, delete = _cleanup_call(client, key, value)
+        logger.info(f"Deleting {description} for key: {key}")
         try:
-            logger.info(f"Deleting agent with ID: {agent_id}")
-            client.agents.delete_agent(agent_id)
-            store.delete(category, "agentid")
+            await delete()
+            deleted_keys.append(key)
         except Exception as e:
-            logger.exception(f"Error deleting agent {agent_id}: {e}")
-
-    logger.info(f"Deleting category: {category}")
-    store.delete_category(category)
+            logger.exception(f"Error deleting {description}: {e}")
+    await state.run_transaction(lambda s: _forget(s, category, deleted_keys))
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+
+from services.kvstore_base import KeyValueStoreBase
+from services.openai_service import ConversationWindow
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+class Conversation:
+    """One user's conversation: the system message and a ring buffer of turns."""
+
+    def __init__(
+        self,
+        system_message: dict,
+        max_messages: int,
+        window: ConversationWindow,
+        messages: list = (),
+    ):
+        self.system_message = system_message
+        self.messages: deque[dict] = deque(messages, maxlen=max_messages)
+        self.window = window
+        self.chars = sum(len(m.get("content") or "") for m in self.messages)
+
+    def append(self, message: dict) -> None:
+        if len(self.messages) == self.messages.maxlen:
+            self.chars -= len(self.messages[0].get("content") or "")
+        self.messages.append(message)
+        self.chars += len(message.get("content") or "")
+
+    def as_list(self) -> list:
+        return [self.system_message, *self.messages]
+
+
+class ConversationStore:
+    """Bounded per-user conversation memory for the chatbot.
+
+    Each user keeps at most max_messages turns in a ring buffer, and at most
+    max_users conversations stay in memory. The least recently used one is
+    evicted when a new user arrives; with a key-value store it is spilled there
+    (for spill_ttl seconds) and loaded back on the user's next message,
+    otherwise it is dropped.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        max_messages: int = 50,
+        max_users: int = 10000,
+        max_tokens: int = 3000,
+        summarize: bool = False,
+        store: Optional[KeyValueStoreBase] = None,
+        spill_ttl: Optional[float] = 7 * 24 * 3600,
+        category: str = "conversations",
+    ):
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.max_messages = max_messages
+        self.max_users = max_users
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.store = store
+        self.spill_ttl = spill_ttl
+        self.category = category
+        self.evictions = 0
+        self.reloads = 0
+        self._users: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new(self, messages: list = (), summary: str = "") -> Conversation:
+        window = ConversationWindow(self.max_tokens, self.summarize)
+        window.summary = summary
+        return Conversation(self.system_message, self.max_messages, window, messages)
+
+    def _spill(self, userid: str, conversation: Conversation) -> None:
+        """Save an evicted conversation to the key-value store, if there is one."""
+        if self.store is None:
+            return
+        try:
+            self.store.set(
+                self.category,
+                userid,
+                {
+                    "messages": list(conversation.messages),
+                    "summary": conversation.window.summary,
+                },
+                ttl=self.spill_ttl,
+            )
+        except Exception as e:
+            logger.exception(f"Error spilling conversation of '{userid}': {e}")
+
+    def get(self, userid: str) -> Conversation:
+        """Get a user's conversation, reloading or creating it as needed."""
+        with self._lock:
+            conversation = self._users.get(userid)
+            if conversation is not None:
+                self._users.move_to_end(userid)
+                return conversation
+        spilled = self.store.get(self.category, userid) if self.store else None
+        with self._lock:
+            conversation = self._users.get(userid)
+            if conversation is None:
+                if spilled:
+                    self.reloads += 1
+                    conversation = self._new(spilled["messages"], spilled["summary"])
+                else:
+                    conversation = self._new()
+                self._users[userid] = conversation
+            self._users.move_to_end(userid)
+            evicted = []
+            while len(self._users) > self.max_users:
+                evicted.append(self._users.popitem(last=False))
+                self.evictions += 1
+        for evicted_id, evicted_conversation in evicted:
+            self._spill(evicted_id, evicted_conversation)
+        return conversation
+
+    def append(self, userid: str, message: dict) -> None:
+        """Add a message to a user's conversation."""
+        self.get(userid).append(message)
+
+    async def window(self, userid: str) -> list:
+        """Get the messages to send for a user, within the token budget."""
+        conversation = self.get(userid)
+        return await conversation.window.window(conversation.as_list())
+
+    def flush(self) -> None:
+        """Spill every in-memory conversation, e.g. before shutting down."""
+        with self._lock:
+            users = list(self._users.items())
+        for userid, conversation in users:
+            self._spill(userid, conversation)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get conversation counts, evictions and the memory held by messages."""
+        with self._lock:
+            conversations = list(self._users.values())
+            return {
+                "users": len(conversations),
+                "messages": sum(len(c.messages) for c in conversations),
+                "content_chars": sum(c.chars for c in conversations),
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+            }
@@ -0,0 +1,165 @@
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from services.kvstore_base import KeyValueStoreBase
+from services.settings_service import get_settings
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache with a memory tier and a disk tier.
+
+    Entries are keyed by model and the SHA-256 of the text, so identical
+    chunks and repeated queries are embedded once. Recently used vectors stay
+    in an in-process LRU; every vector is also written to the key-value store
+    (one category per model) as packed float32, so it survives restarts. Both
+    tiers hold float32 values, so a text gets the same vector from either.
+
+    get() and put() may do disk I/O; async code calls them in a worker thread
+    after trying the memory tier with peek().
+    """
+
+    def __init__(
+        self, store: Optional[KeyValueStoreBase] = None, max_entries: int = 10000
+    ):
+        self.store = store
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[tuple[str, str], array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _category(model: str) -> str:
+        return f"embeddings:{model}"
+
+    def _remember(self, model: str, digest: str, embedding: array) -> None:
+        """Put a vector in the memory tier. Caller holds the lock."""
+        self._items[(model, digest)] = embedding
+        self._items.move_to_end((model, digest))
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def peek(self, model: str, text: str) -> Optional[list[float]]:
+        """Get the embedding of text from the memory tier only, never blocking on I/O.
+
+        A miss is not counted, get() is expected to follow.
+        """
+        digest = self.key(text)
+        with self._lock:
+            embedding = self._items.get((model, digest))
+            if embedding is None:
+                return None
+            self._items.move_to_end((model, digest))
+            self.memory_hits += 1
+            return embedding.tolist()
+
+    def get(self, model: str, text: str) -> Optional[list[float]]:
+        """Get the cached embedding of text, or None on a miss."""
+        embedding = self.peek(model, text)
+        if embedding is not None:
+            return embedding
+        digest = self.key(text)
+        packed = self.store.get(self._category(model), digest) if self.store else None
+        with self._lock:
+            if packed is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            embedding = array("f", packed)
+            self._remember(model, digest, embedding)
+            return embedding.tolist()
+
+    def put(self, model: str, text: str, embedding: list[float]) -> list[float]:
+        """Cache the embedding of text in both tiers and get it as cached."""
+        digest = self.key(text)
+        packed = array("f", embedding)
+        with self._lock:
+            self._remember(model, digest, packed)
+        if self.store is not None:
+            self.store.set(self._category(model), digest, packed.tobytes())
+        return packed.tolist()
+
+    def get_many(self, model: str, texts: list[str]) -> Dict[str, list[float]]:
+        """Get the cached embeddings of several texts with one store read.
+
+        Texts without a cached embedding are left out of the result.
+        """
+        found: Dict[str, list[float]] = {}
+        pending: Dict[str, str] = {}
+        for text in dict.fromkeys(texts):
+            embedding = self.peek(model, text)
+            if embedding is not None:
+                found[text] = embedding
+            else:
+                pending[self.key(text)] = text
+        packed = {}
+        if pending and self.store is not None:
+            packed = self.store.get_many(self._category(model), list(pending))
+        with self._lock:
+            self.misses += len(pending) - len(packed)
+            self.disk_hits += len(packed)
+            for digest, data in packed.items():
+                embedding = array("f", data)
+                self._remember(model, digest, embedding)
+                found[pending[digest]] = embedding.tolist()
+        return found
+
+    def put_many(
+        self, model: str, embeddings: Dict[str, list[float]]
+    ) -> Dict[str, list[float]]:
+        """Cache several embeddings, keyed by text, with one store write.
+
+        Returns them as cached, like put().
+        """
+        packed = {self.key(text): array("f", e) for text, e in embeddings.items()}
+        with self._lock:
+            for digest, embedding in packed.items():
+                self._remember(model, digest, embedding)
+        if self.store is not None and packed:
+            self.store.set_many(
+                self._category(model),
+                {digest: embedding.tobytes() for digest, embedding in packed.items()},
+            )
+        return {text: packed[self.key(text)].tolist() for text in embeddings}
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit counters per tier and the overall hit rate."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups
+                if lookups
+                else 0.0,
+                "memory_entries": len(self._items),
+            }
+
+
+embedding_cache_singleton = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global embedding_cache_singleton
+    if embedding_cache_singleton is None:
+        path = get_settings().embedding_cache_path
+        store = None
+        if path:
+            from services.ckvstore_service import CategoryKeyValueStore
+
+            logger.info(f"Persisting embeddings to {path}")
+            store = CategoryKeyValueStore(path, default_codec="bin")
+        embedding_cache_singleton = EmbeddingCache(store)
+    return embedding_cache_singleton
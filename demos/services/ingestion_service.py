@@ -0,0 +1,224 @@
+import fnmatch
+import hashlib
+import os
+from typing import Dict, Any, Optional, Iterable, Iterator
+
+from services.bm25_service import BM25Index
+from services.kvstore_base import KeyValueStoreBase
+from services.openai_service import get_embeddings_batch, embedding_model
+from services.vectordb_service import VectorIndex
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+def iter_files(
+    directory: str, patterns: Iterable[str] = ("*.md", "*.txt")
+) -> Iterator[str]:
+    """Yield the paths of matching files under directory, in a stable order."""
+    patterns = tuple(patterns)
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                yield os.path.join(root, name)
+
+
+def _split_point(window: str) -> int:
+    """Where to end a full window: a paragraph, line or word break past halfway."""
+    half = len(window) // 2
+    for separator in ("\n\n", "\n", " "):
+        index = window.rfind(separator, half)
+        if index != -1:
+            return index + len(separator)
+    return len(window)
+
+
+def chunk_text(
+    lines: Iterable[str], chunk_size: int = 1000, overlap: int = 200
+) -> Iterator[str]:
+    """Split streamed text into chunks of at most chunk_size characters.
+
+    Consecutive chunks share about overlap characters, starting on a word
+    boundary, so a sentence cut at a chunk edge is still whole in one of them.
+    Only one window of text is held in memory at a time.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("Chunk overlap must be smaller than the chunk size.")
+    buffer = ""
+    carried = 0  # length of the overlap carried over from the previous chunk
+    for line in lines:
+        buffer += line
+        position = 0
+        while len(buffer) - position >= chunk_size:
+            window = buffer[position : position + chunk_size]
+            cut = _split_point(window)
+            chunk = window[:cut].strip()
+            if chunk:
+                yield chunk
+            start = cut - overlap if cut > overlap else cut
+            space = window.find(" ", start, cut)
+            if 0 <= space < cut - 1:
+                start = space + 1
+            carried = cut - start
+            position += start
+        buffer = buffer[position:]
+    if len(buffer) > carried and buffer.strip():
+        yield buffer.strip()
+
+
+def chunk_file(path: str, chunk_size: int = 1000, overlap: int = 200) -> Iterator[str]:
+    """Stream a text file line by line through chunk_text."""
+    with open(path, "r", encoding="utf-8") as file:
+        yield from chunk_text(file, chunk_size, overlap)
+
+
+def _chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class DocumentIngestor:
+    """Keep a vector index in sync with a directory of documents.
+
+    Each run only reads files whose size or modification time changed, only
+    embeds chunks whose content hash is not in the index yet, and removes
+    chunks no file refers to any more. Chunks are identified by content, so a
+    chunk shared by several files is stored once. What each file contributed
+    is recorded in the key-value store under category, one key per file.
+    A BM25Index passed as lexical is kept in step with the vector index.
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        store: KeyValueStoreBase,
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        patterns: Iterable[str] = ("*.md", "*.txt"),
+        category: str = "ingest",
+        lexical: Optional[BM25Index] = None,
+    ):
+        if overlap >= chunk_size:
+            raise ValueError("Chunk overlap must be smaller than the chunk size.")
+        self.index = index
+        self.store = store
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.patterns = tuple(patterns)
+        self.category = category
+        self.lexical = lexical
+        if lexical is not None and len(lexical) != len(index):
+            lexical.remove(range(len(lexical)))
+            lexical.add(index.chunks)
+        # Content hash of every index row, in row order
+        self._row_hashes = [_chunk_hash(chunk) for chunk in index.chunks]
+
+    async def refresh(
+        self, directory: str, index_path: Optional[str] = None
+    ) -> Dict[str, int]:
+        """Apply the changes made to directory since the last run.
+
+        When index_path is given the index is saved before the file records
+        are updated, so an interrupted run is simply redone by the next one.
+
+        Returns:
+            Counts of changed, removed and unchanged files and of added and
+            removed chunks.
+        """
+        rows = set(self._row_hashes)
+        known = dict(self.store.iter_category(self.category))
+        stats = dict.fromkeys(("files_changed", "files_removed", "files_unchanged"), 0)
+        records: Dict[str, Any] = {}
+        referenced = set()
+        pending: Dict[str, str] = {}  # hash -> chunk text waiting for an embedding
+        for path in iter_files(directory, self.patterns):
+            name = os.path.relpath(path, directory)
+            info = os.stat(path)
+            record = known.pop(name, None)
+            if (
+                record is not None
+                and record["mtime"] == info.st_mtime
+                and record["size"] == info.st_size
+                and rows.issuperset(record["chunks"])
+            ):
+                referenced.update(record["chunks"])
+                stats["files_unchanged"] += 1
+                continue
+            hashes = []
+            for chunk in chunk_file(path, self.chunk_size, self.overlap):
+                digest = _chunk_hash(chunk)
+                hashes.append(digest)
+                if digest not in rows:
+                    pending.setdefault(digest, chunk)
+            referenced.update(hashes)
+            records[name] = {
+                "mtime": info.st_mtime,
+                "size": info.st_size,
+                "chunks": hashes,
+            }
+            stats["files_changed"] += 1
+        stats["files_removed"] = len(known)
+
+        texts = list(pending.values())
+        embeddings = await get_embeddings_batch(texts)
+        added = [
+            (digest, text, embedding)
+            for digest, text, embedding in zip(pending, texts, embeddings)
+            if isinstance(embedding, list) and embedding
+        ]
+        if len(added) < len(texts):
+            # Files with chunks that failed to embed are read again next run
+            failed = set(pending) - {digest for digest, _, _ in added}
+            for record in records.values():
+                if failed.intersection(record["chunks"]):
+                    record["mtime"] = None
+        stale = [
+            row
+            for row, digest in enumerate(self._row_hashes)
+            if digest not in referenced
+        ]
+        stats["chunks_removed"] = self.index.remove(stale)
+        if self.lexical is not None:
+            self.lexical.remove(stale)
+        self._row_hashes = [
+            digest for digest in self._row_hashes if digest in referenced
+        ]
+        self.index.add([text for _, text, _ in added], [emb for _, _, emb in added])
+        if self.lexical is not None:
+            self.lexical.add(text for _, text, _ in added)
+        self._row_hashes.extend(digest for digest, _, _ in added)
+        stats["chunks_added"] = len(added)
+        changed = stats["chunks_added"] or stats["chunks_removed"]
+        # An unchanged index is not rewritten, startup only maps the saved one
+        if index_path and (changed or not os.path.exists(index_path)):
+            self.index.save(index_path, model=embedding_model)
+        with self.store.transaction():
+            self.store.set_many(self.category, records)
+            self.store.delete_many(self.category, known)
+        logger.info(f"Ingested {directory}: {stats}")
+        return stats
+
+
+async def ingest_directory(
+    directory: str,
+    store: KeyValueStoreBase,
+    index_path: Optional[str] = None,
+    index: Optional[VectorIndex] = None,
+    lexical: Optional[BM25Index] = None,
+    **options,
+) -> DocumentIngestor:
+    """Open the saved index of a directory and bring it up to date.
+
+    The index at index_path is reused when it was built with the current
+    embedding model, otherwise index (a VectorIndex by default) starts empty.
+    Keyword arguments go to DocumentIngestor, e.g. chunk_size.
+    """
+    index = index if index is not None else VectorIndex()
+    if index_path and os.path.exists(index_path):
+        if VectorIndex.read_header(index_path).get("model") == embedding_model:
+            index = type(index).load(index_path, **index.options)
+        else:
+            logger.info(f"Saved index {index_path} uses another model, rebuilding it")
+    ingestor = DocumentIngestor(index, store, lexical=lexical, **options)
+    await ingestor.refresh(directory, index_path)
+    return ingestor
@@ -0,0 +1,164 @@
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Callable, Tuple
+
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+class KeyValueStoreBase(ABC):
+    """Interface shared by the category/key/value store backends.
+
+    The batch helpers, transaction(), touch() and close() have per-call
+    defaults so a new backend only needs the core methods. Backends that can
+    do better (single commit, pipelining) override them. Backends that store
+    expiry times implement purge_expired() to feed the shared sweeper thread.
+    """
+
+    @abstractmethod
+    def set(
+        self, category: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, category: str, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def delete(self, category: str, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete_category(self, category: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_category(self, category: str) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def get_categories(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def exists(self, category: str, key: Optional[str] = None) -> bool:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def size(self, category: Optional[str] = None) -> int:
+        pass
+
+    def iter_category(
+        self, category: str, prefix: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs of a category in key order, optionally by key prefix."""
+        items = self.get_category(category)
+        for key in sorted(items):
+            if prefix is None or key.startswith(prefix):
+                yield key, items[key]
+
+    def set_many(
+        self, category: str, items: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        """Set several keys in a category."""
+        for key, value in items.items():
+            self.set(category, key, value, ttl)
+
+    def get_many(self, category: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several keys from a category. Missing keys are left out of the result."""
+        results = {}
+        for key in keys:
+            if self.exists(category, key):
+                results[key] = self.get(category, key)
+        return results
+
+    def delete_many(self, category: str, keys: Iterable[str]) -> int:
+        """Delete several keys from a category. Returns the number deleted."""
+        return sum(1 for key in list(keys) if self.delete(category, key))
+
+    @contextmanager
+    def transaction(self) -> Iterator["KeyValueStoreBase"]:
+        """Group writes made inside the block. The default gives no atomicity."""
+        yield self
+
+    def touch(
+        self,
+        category: str,
+        key: str,
+        ttl: Optional[float],
+        min_remaining: Optional[float] = None,
+    ) -> bool:
+        """Reset the expiry of a key. Returns False if the key does not exist.
+
+        Backends that know a key's expiry skip the write while it has more
+        than min_remaining seconds left to live.
+        """
+        with self.transaction():
+            if not self.exists(category, key):
+                return False
+            self.set(category, key, self.get(category, key), ttl)
+            return True
+
+    def purge_expired(
+        self,
+        batch_size: int = 500,
+        on_expire: Optional[Callable[[str, str, Any], None]] = None,
+    ) -> int:
+        """Delete up to batch_size expired keys. Returns the number purged."""
+        return 0
+
+    def start_expiry_sweeper(
+        self,
+        interval: float = 60.0,
+        batch_size: int = 500,
+        on_expire: Optional[Callable[[str, str, Any], None]] = None,
+    ) -> None:
+        """Purge expired keys in bounded batches from a background thread."""
+        if getattr(self, "_sweeper", None) is not None:
+            return
+        stop = threading.Event()
+
+        def sweep():
+            while not stop.is_set():
+                try:
+                    # Keep going while full batches come back, then sleep
+                    while (
+                        not stop.is_set()
+                        and self.purge_expired(batch_size, on_expire) >= batch_size
+                    ):
+                        pass
+                except Exception as e:
+                    logger.exception(f"Error purging expired keys: {e}")
+                stop.wait(interval)
+
+        logger.info(f"Starting expiry sweeper every {interval}s")
+        self._sweeper_stop = stop
+        self._sweeper = threading.Thread(
+            target=sweep, name="kvstore-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def stop_expiry_sweeper(self) -> None:
+        """Stop the background expiry sweeper if it is running."""
+        sweeper = getattr(self, "_sweeper", None)
+        if sweeper is None:
+            return
+        self._sweeper_stop.set()
+        if sweeper is not threading.current_thread():
+            sweeper.join()
+        self._sweeper = None
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get read cache counters. Backends without a cache report zeros."""
+        return {"hits": 0, "misses": 0, "size": 0, "max_size": 0}
+
+    def close(self) -> None:
+        """Release any connections held by the backend."""
+        self.stop_expiry_sweeper()
@@ -0,0 +1,201 @@
+import json
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+# Suffix added to the codec tag of values stored zlib-compressed
+_COMPRESSED = "+z"
+
+
+class Codec(ABC):
+    """Turns store values into TEXT or BLOB column data and back."""
+
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, value: Any) -> str | bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: str | bytes) -> Any:
+        pass
+
+
+class JsonCodec(Codec):
+    """Default codec. Rows written before codecs existed are JSON too."""
+
+    name = "json"
+
+    def encode(self, value: Any) -> str:
+        return json.dumps(value)
+
+    def decode(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class RawCodec(Codec):
+    """Stores strings as-is, so IDs skip JSON quoting and parsing entirely."""
+
+    name = "raw"
+
+    def encode(self, value: Any) -> str:
+        if not isinstance(value, str):
+            raise TypeError("The raw codec only stores strings.")
+        return value
+
+    def decode(self, data: str | bytes) -> Any:
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+
+
+class BinaryCodec(Codec):
+    """Compact tagged binary encoding for structured values, without pickle.
+
+    Supports None, bool, int, float, str, bytes, list/tuple and dict. Integers
+    use zigzag varints, so small numbers take one or two bytes.
+    """
+
+    name = "bin"
+
+    def encode(self, value: Any) -> bytes:
+        out = bytearray()
+        self._write(out, value)
+        return bytes(out)
+
+    def decode(self, data: str | bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        value, offset = self._read(memoryview(data), 0)
+        if offset != len(data):
+            raise ValueError("Trailing bytes after binary value.")
+        return value
+
+    @staticmethod
+    def _write_varint(out: bytearray, number: int) -> None:
+        while number > 0x7F:
+            out.append((number & 0x7F) | 0x80)
+            number >>= 7
+        out.append(number)
+
+    @staticmethod
+    def _read_varint(data: memoryview, offset: int) -> Tuple[int, int]:
+        number = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            number |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return number, offset
+            shift += 7
+
+    def _write(self, out: bytearray, value: Any) -> None:
+        if value is None:
+            out += b"N"
+        elif value is True:
+            out += b"T"
+        elif value is False:
+            out += b"F"
+        elif isinstance(value, int):
+            out += b"i"
+            self._write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            out += b"f" + struct.pack("<d", value)
+        elif isinstance(value, str):
+            encoded = value.encode("utf-8")
+            out += b"s"
+            self._write_varint(out, len(encoded))
+            out += encoded
+        elif isinstance(value, (bytes, bytearray)):
+            out += b"b"
+            self._write_varint(out, len(value))
+            out += value
+        elif isinstance(value, (list, tuple)):
+            out += b"l"
+            self._write_varint(out, len(value))
+            for item in value:
+                self._write(out, item)
+        elif isinstance(value, dict):
+            out += b"d"
+            self._write_varint(out, len(value))
+            for key, item in value.items():
+                self._write(out, key)
+                self._write(out, item)
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} values.")
+
+    def _read(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        tag = data[offset]
+        offset += 1
+        match chr(tag):
+            case "N":
+                return None, offset
+            case "T":
+                return True, offset
+            case "F":
+                return False, offset
+            case "i":
+                number, offset = self._read_varint(data, offset)
+                return (number >> 1) ^ -(number & 1), offset
+            case "f":
+                return struct.unpack_from("<d", data, offset)[0], offset + 8
+            case "s" | "b":
+                length, offset = self._read_varint(data, offset)
+                chunk = bytes(data[offset : offset + length])
+                value = chunk.decode("utf-8") if tag == ord("s") else chunk
+                return value, offset + length
+            case "l":
+                count, offset = self._read_varint(data, offset)
+                items = []
+                for _ in range(count):
+                    item, offset = self._read(data, offset)
+                    items.append(item)
+                return items, offset
+            case "d":
+                count, offset = self._read_varint(data, offset)
+                result = {}
+                for _ in range(count):
+                    key, offset = self._read(data, offset)
+                    result[key], offset = self._read(data, offset)
+                return result, offset
+            case _:
+                raise ValueError(f"Unknown binary value tag: {tag!r}")
+
+
+CODECS: Dict[str, Codec] = {
+    codec.name: codec for codec in (JsonCodec(), RawCodec(), BinaryCodec())
+}
+
+
+def encode_value(
+    value: Any, codec: str = "json", compress_threshold: Optional[int] = None
+) -> Tuple[str | bytes, str]:
+    """Encode a value and return (data, tag) where tag records how to decode it.
+
+    Values that do not fit the raw codec fall back to JSON. Encoded values of
+    at least compress_threshold bytes are zlib-compressed.
+    """
+    if codec == "raw" and not isinstance(value, str):
+        codec = "json"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown value codec: {codec}")
+    data = CODECS[codec].encode(value)
+    if compress_threshold is not None and len(data) >= compress_threshold:
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        return zlib.compress(raw), codec + _COMPRESSED
+    return data, codec
+
+
+def decode_value(data: str | bytes, tag: Optional[str] = None) -> Any:
+    """Decode column data written by encode_value. A missing tag means JSON."""
+    if tag is None or tag == "json":
+        return json.loads(data)
+    if tag.endswith(_COMPRESSED):
+        tag = tag[: -len(_COMPRESSED)]
+        data = zlib.decompress(data)
+        if tag != "bin":
+            data = data.decode("utf-8")
+    if tag == "raw":
+        return data
+    if tag not in CODECS:
+        raise ValueError(f"Unknown value codec: {tag}")
+    return CODECS[tag].decode(data)
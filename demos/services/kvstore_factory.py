@@ -0,0 +1,65 @@
+from typing import Dict, Optional
+
+from services.kvstore_base import KeyValueStoreBase
+from services.settings_service import get_settings
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+memory_store_singleton = None
+
+
+def create_store(
+    backend: Optional[str] = None,
+    cache_size: int = 0,
+    cache_ttl: Optional[float] = None,
+    codecs: Optional[Dict[str, str]] = None,
+) -> KeyValueStoreBase:
+    """Create the key-value store backend selected by name or by the settings.
+
+    Args:
+        backend: sqlite, sharded, memory or redis. Defaults to STORE_BACKEND.
+        cache_size: Read cache entries for the SQLite based backends.
+        cache_ttl: Read cache lifetime in seconds for the SQLite based backends.
+        codecs: Value codec per category (json, raw or bin) for the SQLite based
+            backends. Other backends always store JSON.
+
+    Returns:
+        The store instance. The memory backend is shared by the whole process.
+    """
+    global memory_store_singleton
+    settings = get_settings()
+    backend = (backend or settings.store_backend).lower()
+    logger.info(f"Creating '{backend}' key-value store")
+    match backend:
+        case "sqlite":
+            from services.ckvstore_service import CategoryKeyValueStore
+
+            return CategoryKeyValueStore(
+                settings.store_path,
+                cache_size=cache_size,
+                cache_ttl=cache_ttl,
+                codecs=codecs,
+            )
+        case "sharded":
+            from services.sharded_kvstore_service import ShardedKeyValueStore
+
+            return ShardedKeyValueStore(
+                settings.store_path,
+                shards=settings.store_shards,
+                cache_size=cache_size,
+                cache_ttl=cache_ttl,
+                codecs=codecs,
+            )
+        case "memory":
+            from services.memory_kvstore_service import InMemoryKeyValueStore
+
+            if memory_store_singleton is None:
+                memory_store_singleton = InMemoryKeyValueStore()
+            return memory_store_singleton
+        case "redis":
+            from services.redis_kvstore_service import RedisKeyValueStore
+
+            return RedisKeyValueStore(settings.store_url)
+        case _:
+            raise ValueError(f"Unknown key-value store backend: {backend}")
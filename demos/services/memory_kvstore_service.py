@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator, Tuple, Callable
+
+from services.kvstore_base import KeyValueStoreBase
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+class InMemoryKeyValueStore(KeyValueStoreBase):
+    """Process-local store backend, shared by every thread that holds it.
+
+    Values are kept JSON-encoded so callers get the same copy semantics as the
+    SQLite store. Useful for tests and single-worker deployments.
+    """
+
+    def __init__(self):
+        # category -> key -> (encoded value, expires_at or None)
+        self._data: Dict[str, Dict[str, Tuple[str, Optional[float]]]] = {}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    @staticmethod
+    def _live(entry: Tuple[str, Optional[float]], now: float) -> bool:
+        return entry[1] is None or entry[1] > now
+
+    def _items(self, category: str) -> Dict[str, str]:
+        """Get the live encoded values of a category. Caller holds the lock."""
+        now = time.time()
+        return {
+            key: entry[0]
+            for key, entry in self._data.get(category, {}).items()
+            if self._live(entry, now)
+        }
+
+    def _remember(self, category: str) -> None:
+        """Snapshot a category before its first change inside a transaction."""
+        undo = getattr(self._local, "undo", None)
+        if undo is not None and category not in undo:
+            undo[category] = dict(self._data.get(category, {}))
+
+    def set(
+        self, category: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """Set a value for a given category and key, optionally expiring after ttl seconds."""
+        encoded = json.dumps(value)
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._remember(category)
+            self._data.setdefault(category, {})[key] = (encoded, expires_at)
+
+    def get(self, category: str, key: str) -> Optional[Any]:
+        """Get a value for a given category and key."""
+        with self._lock:
+            entry = self._data.get(category, {}).get(key)
+        if entry is None or not self._live(entry, time.time()):
+            return None
+        return json.loads(entry[0])
+
+    def delete(self, category: str, key: str) -> bool:
+        """Delete a key from a category. Returns True if deleted, False if not found."""
+        with self._lock:
+            items = self._data.get(category)
+            if not items or key not in items:
+                return False
+            self._remember(category)
+            live = self._live(items.pop(key), time.time())
+            if not items:
+                del self._data[category]
+            return live
+
+    def delete_category(self, category: str) -> bool:
+        """Delete an entire category. Returns True if deleted, False if not found."""
+        with self._lock:
+            if category not in self._data:
+                return False
+            self._remember(category)
+            found = bool(self._items(category))
+            del self._data[category]
+            return found
+
+    def get_category(self, category: str) -> Dict[str, Any]:
+        """Get all key-value pairs in a category."""
+        with self._lock:
+            items = self._items(category)
+        return {key: json.loads(value) for key, value in items.items()}
+
+    def iter_category(
+        self, category: str, prefix: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs of a category in key order, decoding lazily."""
+        with self._lock:
+            items = self._items(category)
+        for key in sorted(items):
+            if prefix is None or key.startswith(prefix):
+                yield key, json.loads(items[key])
+
+    def get_categories(self) -> List[str]:
+        """Get all category names."""
+        with self._lock:
+            return sorted(category for category in self._data if self._items(category))
+
+    def exists(self, category: str, key: Optional[str] = None) -> bool:
+        """Check if a category or category/key combination exists."""
+        with self._lock:
+            if key is None:
+                return bool(self._items(category))
+            entry = self._data.get(category, {}).get(key)
+            return entry is not None and self._live(entry, time.time())
+
+    def clear(self) -> None:
+        """Clear all data from the store."""
+        with self._lock:
+            for category in list(self._data):
+                self._remember(category)
+            self._data.clear()
+
+    def size(self, category: Optional[str] = None) -> int:
+        """Get the number of keys in a category or total number of categories."""
+        with self._lock:
+            if category is None:
+                return len(self.get_categories())
+            return len(self._items(category))
+
+    def touch(
+        self,
+        category: str,
+        key: str,
+        ttl: Optional[float],
+        min_remaining: Optional[float] = None,
+    ) -> bool:
+        """Reset the expiry of a live key. Returns False if the key does not exist.
+
+        A key with more than min_remaining seconds left to live is left as it is.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(category, {}).get(key)
+            if entry is None or not self._live(entry, now):
+                return False
+            self._remember(category)
+            if (
+                min_remaining is not None
+                and entry[1] is not None
+                and entry[1] - now > min_remaining
+            ):
+                return True
+            expires_at = now + ttl if ttl is not None else None
+            self._data[category][key] = (entry[0], expires_at)
+            return True
+
+    def purge_expired(
+        self,
+        batch_size: int = 500,
+        on_expire: Optional[Callable[[str, str, Any], None]] = None,
+    ) -> int:
+        """Delete up to batch_size expired keys. Returns the number purged."""
+        now = time.time()
+        purged = []
+        with self._lock:
+            for category, items in list(self._data.items()):
+                for key, entry in list(items.items()):
+                    if len(purged) >= batch_size:
+                        break
+                    if not self._live(entry, now):
+                        self._remember(category)
+                        del items[key]
+                        purged.append((category, key, entry[0]))
+                if not items:
+                    del self._data[category]
+        if on_expire:
+            for category, key, value in purged:
+                try:
+                    on_expire(category, key, json.loads(value))
+                except Exception as e:
+                    logger.exception(f"Error handling expired key '{key}': {e}")
+        return len(purged)
+
+    @contextmanager
+    def transaction(self) -> Iterator["InMemoryKeyValueStore"]:
+        """Hold the store lock for the block and undo its changes if it raises."""
+        with self._lock:
+            if getattr(self._local, "undo", None) is not None:
+                yield self
+                return
+            self._local.undo = {}
+            try:
+                yield self
+            except BaseException:
+                for category, items in self._local.undo.items():
+                    if items:
+                        self._data[category] = items
+                    else:
+                        self._data.pop(category, None)
+                raise
+            finally:
+                self._local.undo = None
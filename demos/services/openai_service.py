@@ -1,6 +1,18 @@
-from openai import AsyncAzureOpenAI
+import asyncio
+from collections import deque
+from typing import AsyncIterator
+
+from openai import (
+    AsyncAzureOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 from services.settings_service import get_settings
+from services.embedding_cache_service import get_embedding_cache
+from services.rate_limiter_service import RequestGovernor, INTERACTIVE, BATCH
 from services.logger_service import get_logger
 
 logger = get_logger(__name__)
@@ -10,19 +22,38 @@ token_provider = get_bearer_token_provider(
 )
 
 settings = get_settings()
+embedding_model = "text-embedding-ada-002"  # or your deployed embedding model
+# Errors worth retrying: throttling, timeouts and transient server failures
+_RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+# Tokens reserved for the answer when estimating the cost of a chat request
+_COMPLETION_TOKENS = 512
 client = None
+# Retries are left to the governor, which also paces and prioritizes requests
 if settings.key:
     client = AsyncAzureOpenAI(
         azure_endpoint=settings.endpoint,
         api_key=settings.key,
         api_version=settings.version,
+        max_retries=0,
     )
 else:
     client = AsyncAzureOpenAI(
         azure_endpoint=settings.endpoint,
         azure_ad_token_provider=token_provider,
         api_version=settings.version,
+        max_retries=0,
     )
+governor = RequestGovernor(
+    requests_per_minute=settings.openai_rpm,
+    tokens_per_minute=settings.openai_tpm,
+    concurrency=settings.openai_concurrency,
+    retryable=_RETRYABLE_ERRORS,
+)
 
 
 def manage_conversation(conversation: list) -> list:
@@ -44,22 +75,70 @@ def manage_conversation(conversation: list) -> list:
     return conversation
 
 
+def _chat_tokens(messages: list) -> int:
+    """Estimated tokens of a chat request, prompt and answer."""
+    prompt = sum(
+        count_tokens(m.get("content") or "") + _MESSAGE_OVERHEAD for m in messages
+    )
+    return prompt + _COMPLETION_TOKENS
+
+
 async def get_chat_completion(messages: list, temperature: float = 0.1) -> str:
     """Get chat completion from OpenAI API."""
     try:
         if messages:
             logger.info(f"Processing chat completion")
-            response = await client.chat.completions.create(
-                model=settings.model,  # or your deployed model name
-                messages=messages,
-                temperature=0.1,
+            tokens = _chat_tokens(messages)
+            response = await governor.call(
+                lambda: client.chat.completions.create(
+                    model=settings.model,  # or your deployed model name
+                    messages=messages,
+                    temperature=0.1,
+                ),
+                tokens,
+                INTERACTIVE,
             )
+            if response.usage:
+                governor.adjust_tokens(response.usage.total_tokens - tokens)
             return response.choices[0].message.content
         return ""
     except Exception as e:
         return f"Error: {str(e)}"
 
 
+async def stream_chat_completion(
+    messages: list, temperature: float = 0.1
+) -> AsyncIterator[str]:
+    """Stream a chat completion from OpenAI API, yielding text as it arrives.
+
+    On failure the last piece yielded is an "Error: ..." string, like the
+    result of get_chat_completion.
+    """
+    try:
+        if messages:
+            logger.info(f"Streaming chat completion")
+            # The request slot is held until the stream is exhausted or closed
+            async with governor.hold(
+                lambda: client.chat.completions.create(
+                    model=settings.model,  # or your deployed model name
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                ),
+                _chat_tokens(messages),
+                INTERACTIVE,
+            ) as stream:
+                try:
+                    async for chunk in stream:
+                        # Azure sends chunks without choices, e.g. content filters
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    await stream.close()
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+
 async def get_embeddings(text: str) -> list[float]:
     """Generate embeddings for the given text using OpenAI API."""
     try:
@@ -67,11 +146,234 @@ async def get_embeddings(text: str) -> list[float]:
             # logger.info(
             #     f"Generating embeddings for text: {text[:50]}..."
             # )  # Log first 50 chars
-            response = await client.embeddings.create(
-                model="text-embedding-ada-002",  # or your deployed embedding model
-                input=text,
-            )
-            return response.data[0].embedding
+            cache = get_embedding_cache()
+            embedding = cache.peek(embedding_model, text)
+            if embedding is None:
+                embedding = await asyncio.to_thread(cache.get, embedding_model, text)
+            if embedding is None:
+                response = await governor.call(
+                    lambda: client.embeddings.create(
+                        model=embedding_model,
+                        input=text,
+                    ),
+                    _estimate_tokens(text),
+                    INTERACTIVE,
+                )
+                embedding = await asyncio.to_thread(
+                    cache.put, embedding_model, text, response.data[0].embedding
+                )
+            return embedding
         return []
     except Exception as e:
         return f"Error: {str(e)}"
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (about four bytes per token) used to size batches."""
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def _pack_batches(
+    texts: list[str], max_inputs: int, max_tokens: int
+) -> list[list[str]]:
+    """Group texts into request batches under both the input and token limits."""
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    tokens = 0
+    for text in texts:
+        cost = _estimate_tokens(text)
+        if batch and (len(batch) >= max_inputs or tokens + cost > max_tokens):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(text)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def _embed_batch(batch: list[str]) -> list[list[float]]:
+    """Embed one batch in the batch lane, so interactive requests go first."""
+    response = await governor.call(
+        lambda: client.embeddings.create(
+            model=embedding_model,
+            input=batch,
+        ),
+        sum(_estimate_tokens(text) for text in batch),
+        BATCH,
+    )
+    data = sorted(response.data, key=lambda item: item.index)
+    return [item.embedding for item in data]
+
+
+async def get_embeddings_batch(
+    texts: list[str],
+    max_inputs: int = 256,
+    max_tokens: int = 100_000,
+    concurrency: int = 4,
+) -> list[list[float] | str]:
+    """Generate embeddings for many texts with batched, concurrent API calls.
+
+    Cached and duplicate texts are not sent. Misses are packed into requests of
+    at most max_inputs texts and about max_tokens tokens, and at most
+    concurrency requests run at once. Requests go through the governor's
+    batch lane, which retries throttled ones. Results are in the order of texts; an
+    empty text gives [] and a batch that keeps failing gives "Error: ..."
+    strings, like get_embeddings.
+    """
+    cache = get_embedding_cache()
+    found: dict[str, list[float] | str] = {"": []}
+    unique = [text for text in dict.fromkeys(texts) if text]
+    found.update(await asyncio.to_thread(cache.get_many, embedding_model, unique))
+    missing = list(dict.fromkeys(text for text in texts if text not in found))
+    if missing:
+        batches = _pack_batches(missing, max_inputs, max_tokens)
+        logger.info(
+            f"Embedding {len(missing)} texts in {len(batches)} batches, "
+            f"{len(texts) - len(missing)} cached or repeated"
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(batch: list[str]) -> None:
+            async with semaphore:
+                try:
+                    embeddings = await _embed_batch(batch)
+                except Exception as e:
+                    logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                    found.update((text, f"Error: {str(e)}") for text in batch)
+                    return
+            found.update(
+                await asyncio.to_thread(
+                    cache.put_many, embedding_model, dict(zip(batch, embeddings))
+                )
+            )
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+    return [found[text] for text in texts]
+
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of text with tiktoken when installed, else estimate them."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return _estimate_tokens(text)
+
+
+# Tokens the chat format adds to every message on top of its content
+_MESSAGE_OVERHEAD = 4
+
+
+class ConversationWindow:
+    """Keep the messages sent for one conversation within a token budget.
+
+    The conversation is a sequence with the system message first that grows
+    by appending and may lose its oldest messages, like a ring buffer. Token
+    counts are computed once per message and the window start only moves
+    forward, so each call costs O(new and dropped messages). When
+    summarize is on, evicted turns are folded into a running summary that is
+    sent after the system message; summary_tokens of the budget are kept
+    for it.
+    """
+
+    def __init__(
+        self, max_tokens: int = 3000, summarize: bool = False, summary_tokens: int = 300
+    ):
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self._system: tuple[dict | None, int] = (None, 0)
+        # (message, tokens) of the messages after the system message, split
+        # into those already evicted and those still in the window
+        self._evicted: deque[tuple[dict, int]] = deque()
+        self._window: deque[tuple[dict, int]] = deque()
+        self._total = 0  # tokens of the messages in the window
+
+    @staticmethod
+    def _count(message: dict) -> int:
+        return count_tokens(message.get("content") or "") + _MESSAGE_OVERHEAD
+
+    def _summary_message(self) -> list:
+        if not self.summary:
+            return []
+        return [
+            {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {self.summary}",
+            }
+        ]
+
+    async def _fold(self, evicted: list) -> None:
+        """Update the running summary with evicted turns."""
+        turns = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+        messages = [
+            {
+                "role": "system",
+                "content": "Update the summary of a conversation with the new "
+                "turns. Reply with the summary only, in at most "
+                f"{self.summary_tokens} tokens.",
+            },
+            {
+                "role": "user",
+                "content": f"Summary so far: {self.summary or '(none)'}\n\n"
+                f"New turns:\n{turns}",
+            },
+        ]
+        summary = await get_chat_completion(messages)
+        if summary and not summary.startswith("Error: "):
+            self.summary = summary
+        else:
+            logger.error(f"Could not summarize evicted turns: {summary}")
+
+    async def window(self, conversation: list) -> list:
+        """Get the messages to send: the system message, the summary if any and
+        the most recent messages that fit in max_tokens.
+
+        The last message is always kept, even when it alone exceeds the budget.
+        """
+        if not conversation:
+            return []
+        conversation = list(conversation)
+        if self._system[0] is not conversation[0]:
+            self._system = (conversation[0], self._count(conversation[0]))
+        body = conversation[1:]
+        # Forget the messages dropped from the front; if the first message is
+        # unknown the conversation was replaced and everything is counted again
+        first = body[0] if body else None
+        while self._evicted and self._evicted[0][0] is not first:
+            self._evicted.popleft()
+        if not self._evicted:
+            while self._window and self._window[0][0] is not first:
+                self._total -= self._window.popleft()[1]
+        for message in body[len(self._evicted) + len(self._window) :]:
+            tokens = self._count(message)
+            self._window.append((message, tokens))
+            self._total += tokens
+        budget = self.max_tokens - self._system[1]
+        if self.summarize:
+            budget -= self.summary_tokens + _MESSAGE_OVERHEAD
+        evicted = []
+        while self._total > budget and len(self._window) > 1:
+            entry = self._window.popleft()
+            self._evicted.append(entry)
+            self._total -= entry[1]
+            evicted.append(entry[0])
+        if self.summarize and evicted:
+            logger.info(f"Summarizing {len(evicted)} evicted messages")
+            await self._fold(evicted)
+        return (
+            conversation[:1]
+            + self._summary_message()
+            + [message for message, _ in self._window]
+        )
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+# Priority lanes, lower runs first
+INTERACTIVE = 0
+BATCH = 1
+
+
+class TokenBucket:
+    """Token bucket refilled continuously, holding up to one minute's worth.
+
+    A rate of None or 0 means no limit.
+    """
+
+    def __init__(self, rate_per_minute: Optional[float]):
+        self.capacity = float(rate_per_minute or 0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self._updated) * self.capacity / 60
+        )
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until amount can be taken, 0.0 if it can be taken now."""
+        if not self.capacity:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        """Take amount, the level may go negative when correcting estimates."""
+        if self.capacity:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from the Retry-After headers."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # an HTTP date, fall back to our own backoff
+    return None
+
+
+class RequestGovernor:
+    """Client-side limits for API calls, shared by every caller of a client.
+
+    Limits requests and tokens per minute and concurrent requests. Callers
+    wait in one queue ordered by lane, so interactive requests go ahead of
+    queued batch work. A throttled request is retried with jittered
+    exponential backoff or after the server's Retry-After, and every lane is
+    paused for that long so a burst does not turn into a storm of 429s.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        concurrency: int = 16,
+        max_retries: int = 6,
+        retryable: Tuple[type, ...] = (),
+        max_backoff: float = 30.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retryable = retryable
+        self.max_backoff = max_backoff
+        self.active = 0
+        self.retries = 0
+        self.waited = 0.0  # seconds spent waiting for a slot, all requests
+        self._paused_until = 0.0
+        self._waiting: list[tuple[int, int]] = []
+        self._order = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._condition: asyncio.Condition | None = None
+
+    def _cond(self) -> asyncio.Condition:
+        # Created on first use in each event loop, so a module-level governor
+        # works outside a loop and across asyncio.run() calls
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._condition = loop, asyncio.Condition()
+            self._waiting, self.active = [], 0
+        return self._condition
+
+    def _delay(self, tokens: float) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self.requests.delay(1),
+            self.tokens.delay(tokens),
+        )
+
+    @asynccontextmanager
+    async def slot(self, tokens: float = 0, priority: int = INTERACTIVE):
+        """Hold one request slot, waiting for the rate limits and earlier callers."""
+        cond = self._cond()
+        ticket = (priority, next(self._order))
+        started = time.monotonic()
+        async with cond:
+            heapq.heappush(self._waiting, ticket)
+            cond.notify_all()  # a more urgent caller may now be first in line
+            try:
+                while True:
+                    if self._waiting[0] == ticket and self.active < self.concurrency:
+                        delay = self._delay(tokens)
+                        if delay <= 0:
+                            break
+                    else:
+                        delay = None
+                    try:
+                        await asyncio.wait_for(cond.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                cond.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.active += 1
+            self.waited += time.monotonic() - started
+            cond.notify_all()
+        try:
+            yield
+        finally:
+            async with cond:
+                self.active -= 1
+                cond.notify_all()
+
+    def adjust_tokens(self, extra: float) -> None:
+        """Charge the actual minus the estimated tokens of a finished request."""
+        self.tokens.take(extra)
+
+    async def call(
+        self,
+        request: Callable[[], Awaitable[Any]],
+        tokens: float = 0,
+        priority: int = INTERACTIVE,
+    ) -> Any:
+        """Run request() in a slot, retrying retryable errors up to max_retries."""
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(tokens, priority):
+                try:
+                    return await request()
+                except self.retryable as e:
+                    delay = self._retry_delay(attempt, e)
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def hold(
+        self,
+        request: Callable[[], Awaitable[Any]],
+        tokens: float = 0,
+        priority: int = INTERACTIVE,
+    ) -> AsyncIterator[Any]:
+        """Like call(), but keep the slot until the block exits.
+
+        For streamed responses, which are still being generated after
+        request() returns, so concurrency limits the open streams.
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(tokens, priority):
+                try:
+                    result = await request()
+                except self.retryable as e:
+                    delay = self._retry_delay(attempt, e)
+                else:
+                    yield result
+                    return
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retrying, re-raising once retries run out."""
+        if attempt == self.max_retries:
+            raise error
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = retry_after
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        else:
+            backoff = min(self.max_backoff, 2**attempt)
+            delay = backoff * random.uniform(0.5, 1.0)
+        self.retries += 1
+        logger.warning(f"Request failed ({error}), retrying in {delay:.1f}s")
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the in-flight and queued requests, retries and total wait time."""
+        return {
+            "active": self.active,
+            "queued": len(self._waiting),
+            "retries": self.retries,
+            "waited": self.waited,
+        }
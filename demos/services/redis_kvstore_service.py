@@ -0,0 +1,165 @@
+import json
+import re
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple
+
+from services.kvstore_base import KeyValueStoreBase
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+class RedisKeyValueStore(KeyValueStoreBase):
+    """Store backend for Redis or a Redis-compatible server (Valkey, KeyDB, ...).
+
+    Each category is a hash named <prefix><category>, so every uvicorn worker
+    shares the same state without file locking. Pass an existing redis-py
+    compatible client, or a URL to build one with the optional redis package.
+    Expiring keys are removed by the server itself, so there is nothing to purge.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "ckv:",
+        client: Any = None,
+    ):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ValueError(
+                    "The redis package is required for the redis store backend."
+                ) from e
+            logger.info(f"Connecting to key-value server at {url}")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _name(self, category: str) -> str:
+        return self.prefix + category
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _expire(self, name: str, keys: List[str], ttl: Optional[float]) -> None:
+        """Expire hash fields server side. Needs HEXPIRE (Redis 7.4 or later)."""
+        if ttl is None:
+            self.client.execute_command("HPERSIST", name, "FIELDS", len(keys), *keys)
+        else:
+            seconds = max(1, int(ttl))
+            self.client.execute_command(
+                "HEXPIRE", name, seconds, "FIELDS", len(keys), *keys
+            )
+
+    def set(
+        self, category: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """Set a value for a given category and key, optionally expiring after ttl seconds."""
+        self.client.hset(self._name(category), key, json.dumps(value))
+        if ttl is not None:
+            self._expire(self._name(category), [key], ttl)
+
+    def get(self, category: str, key: str) -> Optional[Any]:
+        """Get a value for a given category and key."""
+        encoded = self.client.hget(self._name(category), key)
+        return json.loads(encoded) if encoded is not None else None
+
+    def delete(self, category: str, key: str) -> bool:
+        """Delete a key from a category. Returns True if deleted, False if not found."""
+        return self.client.hdel(self._name(category), key) > 0
+
+    def set_many(
+        self, category: str, items: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        """Set several keys in a category in one round-trip."""
+        if items:
+            self.client.hset(
+                self._name(category),
+                mapping={key: json.dumps(value) for key, value in items.items()},
+            )
+            if ttl is not None:
+                self._expire(self._name(category), list(items), ttl)
+
+    def touch(
+        self,
+        category: str,
+        key: str,
+        ttl: Optional[float],
+        min_remaining: Optional[float] = None,
+    ) -> bool:
+        """Reset the expiry of a key. Returns False if the key does not exist.
+
+        min_remaining is ignored, HEXPIRE is as cheap as reading the expiry.
+        """
+        if not self.exists(category, key):
+            return False
+        self._expire(self._name(category), [key], ttl)
+        return True
+
+    def get_many(self, category: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several keys from a category in one round-trip."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.hmget(self._name(category), keys)
+        return {
+            key: json.loads(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def delete_many(self, category: str, keys: Iterable[str]) -> int:
+        """Delete several keys from a category in one round-trip."""
+        keys = list(keys)
+        return self.client.hdel(self._name(category), *keys) if keys else 0
+
+    def delete_category(self, category: str) -> bool:
+        """Delete an entire category. Returns True if deleted, False if not found."""
+        return self.client.delete(self._name(category)) > 0
+
+    def get_category(self, category: str) -> Dict[str, Any]:
+        """Get all key-value pairs in a category."""
+        items = self.client.hgetall(self._name(category))
+        return {self._text(key): json.loads(value) for key, value in items.items()}
+
+    def iter_category(
+        self, category: str, prefix: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs of a category with HSCAN, in server order."""
+        match = None
+        if prefix:
+            # Escape glob characters so the prefix matches literally
+            match = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        for key, value in self.client.hscan_iter(
+            self._name(category), match=match, count=batch_size
+        ):
+            yield self._text(key), json.loads(value)
+
+    def get_categories(self) -> List[str]:
+        """Get all category names."""
+        names = self.client.scan_iter(match=self.prefix + "*")
+        return sorted(self._text(name)[len(self.prefix) :] for name in names)
+
+    def exists(self, category: str, key: Optional[str] = None) -> bool:
+        """Check if a category or category/key combination exists."""
+        if key is None:
+            return self.client.exists(self._name(category)) > 0
+        return bool(self.client.hexists(self._name(category), key))
+
+    def clear(self) -> None:
+        """Clear every category under this store's prefix."""
+        names = list(self.client.scan_iter(match=self.prefix + "*"))
+        if names:
+            self.client.delete(*names)
+
+    def size(self, category: Optional[str] = None) -> int:
+        """Get the number of keys in a category or total number of categories."""
+        if category is None:
+            return len(self.get_categories())
+        return self.client.hlen(self._name(category))
+
+    def close(self) -> None:
+        """Close the client connection pool."""
+        self.stop_expiry_sweeper()
+        self.client.close()
@@ -0,0 +1,175 @@
+import re
+import time
+from typing import Dict, Any, Optional, AsyncIterator
+
+import numpy as np
+
+from services.openai_service import (
+    get_chat_completion,
+    get_embeddings,
+    stream_chat_completion,
+)
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different prompts match."""
+    return _SPACES.sub(" ", text).strip().lower()
+
+
+class _TenantCache:
+    """Cached answers of one tenant with their normalized key embeddings."""
+
+    def __init__(self, dim: int):
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.answers: list[str] = []
+        self.expires_at: list[float] = []
+        self.last_used: list[float] = []
+
+    def drop(self, rows: list[int]) -> None:
+        if rows:
+            self.vectors = np.delete(self.vectors, rows, axis=0)
+            removed = set(rows)
+            for name in ("answers", "expires_at", "last_used"):
+                items = getattr(self, name)
+                kept = [x for i, x in enumerate(items) if i not in removed]
+                setattr(self, name, kept)
+
+
+class SemanticResponseCache:
+    """Semantic cache in front of get_chat_completion.
+
+    The cache key is the normalized text of the user messages sent to the
+    model, which in the RAG chatbot includes the retrieved context, so a
+    follow-up question only matches the same conversation so far. A request
+    whose key embedding has cosine similarity of at least threshold with a
+    cached key gets the cached answer without a completion call. Entries
+    expire after ttl seconds and each tenant keeps at most max_entries,
+    evicting the least recently used. Tenants never see each other's answers.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: Optional[float] = 3600,
+        max_entries: int = 1000,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._tenants: Dict[str, _TenantCache] = {}
+
+    @staticmethod
+    def cache_key(messages: list) -> str:
+        """Normalized text of the user messages, what the cache matches on."""
+        return normalize_prompt(
+            "\n".join(m["content"] for m in messages if m.get("role") == "user")
+        )
+
+    def _lookup(self, tenant: str, vector: np.ndarray) -> Optional[str]:
+        entries = self._tenants.get(tenant)
+        if entries is None or entries.vectors.shape[1] != len(vector):
+            return None
+        now = time.time()
+        entries.drop([i for i, t in enumerate(entries.expires_at) if t <= now])
+        if not entries.answers:
+            return None
+        scores = entries.vectors @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        entries.last_used[best] = now
+        return entries.answers[best]
+
+    def _store(self, tenant: str, vector: np.ndarray, answer: str) -> None:
+        entries = self._tenants.get(tenant)
+        if entries is None or entries.vectors.shape[1] != len(vector):
+            entries = self._tenants[tenant] = _TenantCache(len(vector))
+        if len(entries.answers) >= self.max_entries:
+            overflow = len(entries.answers) - self.max_entries + 1
+            entries.drop(list(np.argsort(entries.last_used)[:overflow]))
+        now = time.time()
+        entries.vectors = np.vstack([entries.vectors, vector[None, :]])
+        entries.answers.append(answer)
+        entries.expires_at.append(now + self.ttl if self.ttl is not None else np.inf)
+        entries.last_used.append(now)
+
+    async def _key_vector(self, messages: list) -> Optional[np.ndarray]:
+        """Normalized embedding of the cache key, None if it cannot be embedded."""
+        key = self.cache_key(messages)
+        embedding = await get_embeddings(key) if key else []
+        if not isinstance(embedding, list) or not embedding:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _cached(self, tenant: str, vector: Optional[np.ndarray]) -> Optional[str]:
+        if vector is None:
+            # Cannot look the request up, so neither use nor fill the cache
+            return None
+        answer = self._lookup(tenant, vector)
+        if answer is not None:
+            self.hits += 1
+            logger.info(f"Semantic cache hit for tenant '{tenant}'")
+        else:
+            self.misses += 1
+        return answer
+
+    def _remember(self, tenant: str, vector: Optional[np.ndarray], answer: str) -> None:
+        if vector is not None and answer and not answer.startswith("Error: "):
+            self._store(tenant, vector, answer)
+
+    async def complete(
+        self, messages: list, tenant: str = "default", temperature: float = 0.1
+    ) -> str:
+        """Answer from the cache if a similar request was seen, else call the model."""
+        vector = await self._key_vector(messages)
+        answer = self._cached(tenant, vector)
+        if answer is None:
+            answer = await get_chat_completion(messages, temperature)
+            self._remember(tenant, vector, answer)
+        return answer
+
+    async def stream(
+        self, messages: list, tenant: str = "default", temperature: float = 0.1
+    ) -> AsyncIterator[str]:
+        """Like complete(), but stream the model's answer as it is generated.
+
+        A cached answer is yielded in one piece. A streamed answer is cached
+        once it has completed without error.
+        """
+        vector = await self._key_vector(messages)
+        answer = self._cached(tenant, vector)
+        if answer is not None:
+            yield answer
+            return
+        pieces = []
+        async for piece in stream_chat_completion(messages, temperature):
+            pieces.append(piece)
+            yield piece
+        if pieces and not pieces[-1].startswith("Error: "):
+            self._remember(tenant, vector, "".join(pieces))
+
+    def invalidate(self, tenant: Optional[str] = None) -> None:
+        """Forget the answers of one tenant, or of every tenant."""
+        if tenant is None:
+            self._tenants.clear()
+        else:
+            self._tenants.pop(tenant, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit and miss counters, the hit rate and the entries per tenant."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": {t: len(e.answers) for t, e in self._tenants.items()},
+        }
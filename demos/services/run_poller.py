@@ -0,0 +1,158 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, Optional
+
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+# Statuses after which a run will not change any more
+TERMINAL_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+
+
+class RunPoller:
+    """Adaptive polling for agent runs.
+
+    Polls quickly right after a run starts or changes status, then backs off
+    exponentially up to max_interval, so short runs are noticed early and
+    long runs cost few get_run calls. A run still going after deadline
+    seconds is cancelled. stats() reports polls per run for tuning.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 0.1,
+        backoff: float = 1.5,
+        max_interval: float = 2.0,
+        deadline: Optional[float] = 300.0,
+    ):
+        self.initial_interval = initial_interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.deadline = deadline
+        self.runs = 0
+        self.polls = 0
+        self.timeouts = 0
+
+    def _next(self, run: Any, state: dict) -> Optional[float]:
+        """Record a poll and get the seconds to wait, None once polling is over."""
+        state["polls"] += 1
+        if run.status != state["status"]:
+            logger.info(f"Agent running with status: {run.status}")
+            state["status"] = run.status
+            state["interval"] = self.initial_interval
+        elapsed = time.monotonic() - state["started"]
+        if run.status in TERMINAL_STATUSES:
+            self._finish(run, state, elapsed)
+            return None
+        if self.deadline is not None and elapsed >= self.deadline:
+            self.timeouts += 1
+            logger.warning(f"Run {run.id} missed its {self.deadline}s deadline")
+            self._finish(run, state, elapsed)
+            return None
+        delay = state["interval"]
+        state["interval"] = min(delay * self.backoff, self.max_interval)
+        if self.deadline is not None:
+            delay = min(delay, self.deadline - elapsed)
+        return delay
+
+    def _finish(self, run: Any, state: dict, elapsed: float) -> None:
+        self.runs += 1
+        self.polls += state["polls"]
+        logger.info(
+            f"Run {run.id} ended as {run.status} after {state['polls']} polls "
+            f"in {elapsed:.1f}s"
+        )
+
+    def _start(self) -> dict:
+        return {
+            "polls": 0,
+            "status": None,
+            "interval": self.initial_interval,
+            "started": time.monotonic(),
+            "submitted": set(),
+        }
+
+    @staticmethod
+    def _new_action(run: Any, state: dict) -> bool:
+        """Whether the run asks for tool outputs that were not submitted yet.
+
+        A run keeps reporting requires_action for a moment after its outputs
+        are submitted, so tool calls are remembered by id and asked for once.
+        """
+        action = getattr(run, "required_action", None)
+        tool_calls = getattr(
+            getattr(action, "submit_tool_outputs", None), "tool_calls", None
+        )
+        ids = {call.id for call in tool_calls or ()}
+        if ids and ids <= state["submitted"]:
+            return False
+        state["submitted"] |= ids
+        return True
+
+    def wait(
+        self,
+        get_run: Callable[[], Any],
+        cancel_run: Optional[Callable[[], Any]] = None,
+        on_requires_action: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Poll get_run() until the run ends and return its last state.
+
+        on_requires_action(run) is called once for each set of tool calls
+        the run waits for. When the deadline passes cancel_run() is called and
+        the run is returned as it was, so its status is not "completed".
+        """
+        state = self._start()
+        while True:
+            run = get_run()
+            delay = self._next(run, state)
+            if delay is None:
+                if run.status not in TERMINAL_STATUSES and cancel_run:
+                    cancel_run()
+                return run
+            if (
+                run.status == "requires_action"
+                and on_requires_action
+                and self._new_action(run, state)
+            ):
+                on_requires_action(run)
+                state["interval"] = self.initial_interval
+            time.sleep(delay)
+
+    async def wait_async(
+        self,
+        get_run: Callable[[], Any],
+        cancel_run: Optional[Callable[[], Any]] = None,
+        on_requires_action: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """wait() for async clients. The callbacks may return awaitables."""
+        state = self._start()
+        while True:
+            run = await get_run()
+            delay = self._next(run, state)
+            if delay is None:
+                if run.status not in TERMINAL_STATUSES and cancel_run:
+                    result = cancel_run()
+                    if inspect.isawaitable(result):
+                        await result
+                return run
+            if (
+                run.status == "requires_action"
+                and on_requires_action
+                and self._new_action(run, state)
+            ):
+                result = on_requires_action(run)
+                if inspect.isawaitable(result):
+                    await result
+                state["interval"] = self.initial_interval
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the finished runs, total polls, polls per run and missed deadlines."""
+        return {
+            "runs": self.runs,
+            "polls": self.polls,
+            "polls_per_run": self.polls / self.runs if self.runs else 0.0,
+            "timeouts": self.timeouts,
+        }
@@ -12,6 +12,16 @@ class Settings:
         self._version: str = os.getenv("VERSION")
         self._model: str = os.getenv("MODEL", "gpt-4o")
         self._key: str = os.getenv("KEY")
+        self._store_backend: str = os.getenv("STORE_BACKEND", "sqlite")
+        self._store_path: str = os.getenv("STORE_PATH", "./store.db")
+        self._store_shards: int = int(os.getenv("STORE_SHARDS", "8"))
+        self._store_url: str = os.getenv("STORE_URL", "redis://localhost:6379/0")
+        self._embedding_cache_path: str = os.getenv(
+            "EMBEDDING_CACHE_PATH", "./embeddings.db"
+        )
+        self._openai_rpm: int = int(os.getenv("OPENAI_RPM", "0"))
+        self._openai_tpm: int = int(os.getenv("OPENAI_TPM", "0"))
+        self._openai_concurrency: int = int(os.getenv("OPENAI_CONCURRENCY", "16"))
         if not self._version:
             raise ValueError("Version is not set in the environment variables.")
         if not self._endpoint:
@@ -58,6 +68,46 @@ class Settings:
             raise ValueError("Key is not set.")
         return self._key
 
+    @property
+    def store_backend(self) -> str:
+        """Get the key-value store backend (sqlite, sharded, memory or redis)."""
+        return self._store_backend
+
+    @property
+    def store_path(self) -> str:
+        """Get the SQLite file path used by the sqlite and sharded backends."""
+        return self._store_path
+
+    @property
+    def store_shards(self) -> int:
+        """Get the number of SQLite files used by the sharded backend."""
+        return self._store_shards
+
+    @property
+    def store_url(self) -> str:
+        """Get the server URL used by the redis backend."""
+        return self._store_url
+
+    @property
+    def embedding_cache_path(self) -> str:
+        """Get the SQLite file for cached embeddings, empty to keep them in memory."""
+        return self._embedding_cache_path
+
+    @property
+    def openai_rpm(self) -> int:
+        """Get the OpenAI requests per minute limit, 0 for no limit."""
+        return self._openai_rpm
+
+    @property
+    def openai_tpm(self) -> int:
+        """Get the OpenAI tokens per minute limit, 0 for no limit."""
+        return self._openai_tpm
+
+    @property
+    def openai_concurrency(self) -> int:
+        """Get the maximum number of OpenAI requests in flight."""
+        return self._openai_concurrency
+
 
 setting_singleton = None
 
@@ -0,0 +1,177 @@
+import heapq
+import os
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Callable, Tuple
+
+from services.ckvstore_service import CategoryKeyValueStore
+from services.kvstore_base import KeyValueStoreBase
+from services.logger_service import get_logger
+
+logger = get_logger(__name__)
+
+
+class ShardedKeyValueStore(KeyValueStoreBase):
+    """Spread (category, key) pairs over several SQLite files.
+
+    Each shard is a CategoryKeyValueStore, so every worker process writing to
+    the store contends on 1/N of the rows instead of a single database file.
+    Keys are routed with crc32 so that every process agrees on the shard.
+    """
+
+    def __init__(
+        self, db_path: str = "./store.db", shards: int = 8, **store_options
+    ):
+        if shards < 1:
+            raise ValueError("Shard count must be at least 1.")
+        self.db_path = db_path
+        root, ext = os.path.splitext(db_path)
+        ext = ext or ".db"
+        logger.info(f"Opening {shards} store shards at {root}-*{ext}")
+        self.shards: List[CategoryKeyValueStore] = [
+            CategoryKeyValueStore(f"{root}-{i}{ext}", **store_options)
+            for i in range(shards)
+        ]
+
+    def _index(self, category: str, key: str) -> int:
+        digest = zlib.crc32(f"{category}\x00{key}".encode("utf-8"))
+        return digest % len(self.shards)
+
+    def _shard(self, category: str, key: str) -> CategoryKeyValueStore:
+        return self.shards[self._index(category, key)]
+
+    def _group(self, category: str, keys: Iterable[str]) -> Dict[int, List[str]]:
+        """Bucket keys by the index of the shard that owns them."""
+        groups: Dict[int, List[str]] = defaultdict(list)
+        for key in keys:
+            groups[self._index(category, key)].append(key)
+        return groups
+
+    def set(
+        self, category: str, key: str, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        """Set a value for a given category and key, optionally expiring after ttl seconds."""
+        self._shard(category, key).set(category, key, value, ttl)
+
+    def get(self, category: str, key: str) -> Optional[Any]:
+        """Get a value for a given category and key."""
+        return self._shard(category, key).get(category, key)
+
+    def delete(self, category: str, key: str) -> bool:
+        """Delete a key from a category. Returns True if deleted, False if not found."""
+        return self._shard(category, key).delete(category, key)
+
+    def set_many(
+        self, category: str, items: Dict[str, Any], ttl: Optional[float] = None
+    ) -> None:
+        """Set several keys in a category with one commit per shard touched."""
+        for index, keys in self._group(category, items).items():
+            self.shards[index].set_many(category, {k: items[k] for k in keys}, ttl)
+
+    def get_many(self, category: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Get several keys from a category with one query per shard touched."""
+        results: Dict[str, Any] = {}
+        for index, group in self._group(category, keys).items():
+            results.update(self.shards[index].get_many(category, group))
+        return results
+
+    def delete_many(self, category: str, keys: Iterable[str]) -> int:
+        """Delete several keys from a category with one commit per shard touched."""
+        return sum(
+            self.shards[index].delete_many(category, group)
+            for index, group in self._group(category, keys).items()
+        )
+
+    def delete_category(self, category: str) -> bool:
+        """Delete an entire category from every shard."""
+        deleted = [shard.delete_category(category) for shard in self.shards]
+        return any(deleted)
+
+    def get_category(self, category: str) -> Dict[str, Any]:
+        """Get all key-value pairs in a category across shards."""
+        results: Dict[str, Any] = {}
+        for shard in self.shards:
+            results.update(shard.get_category(category))
+        return results
+
+    def iter_category(
+        self, category: str, prefix: Optional[str] = None, batch_size: int = 500
+    ) -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs in key order, merging the pages of every shard."""
+        return heapq.merge(
+            *(
+                shard.iter_category(category, prefix, batch_size)
+                for shard in self.shards
+            ),
+            key=lambda item: item[0],
+        )
+
+    def get_categories(self) -> List[str]:
+        """Get all category names across shards."""
+        categories = set()
+        for shard in self.shards:
+            categories.update(shard.get_categories())
+        return sorted(categories)
+
+    def exists(self, category: str, key: Optional[str] = None) -> bool:
+        """Check if a category or category/key combination exists."""
+        if key is not None:
+            return self._shard(category, key).exists(category, key)
+        return any(shard.exists(category) for shard in self.shards)
+
+    def clear(self) -> None:
+        """Clear all data from every shard."""
+        for shard in self.shards:
+            shard.clear()
+
+    def size(self, category: Optional[str] = None) -> int:
+        """Get the number of keys in a category or total number of categories."""
+        if category is None:
+            return len(self.get_categories())
+        return sum(shard.size(category) for shard in self.shards)
+
+    def touch(
+        self,
+        category: str,
+        key: str,
+        ttl: Optional[float],
+        min_remaining: Optional[float] = None,
+    ) -> bool:
+        """Reset the expiry of a live key. Returns False if the key does not exist."""
+        return self._shard(category, key).touch(category, key, ttl, min_remaining)
+
+    def purge_expired(
+        self,
+        batch_size: int = 500,
+        on_expire: Optional[Callable[[str, str, Any], None]] = None,
+    ) -> int:
+        """Delete up to batch_size expired keys, split evenly across shards."""
+        per_shard = max(1, batch_size // len(self.shards))
+        return sum(shard.purge_expired(per_shard, on_expire) for shard in self.shards)
+
+    @contextmanager
+    def transaction(self) -> Iterator["ShardedKeyValueStore"]:
+        """Open a transaction on every shard.
+
+        Shards commit one after another, so the block is atomic per shard only.
+        Locks are always taken in shard order, so concurrent callers cannot deadlock.
+        """
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.transaction())
+            yield self
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get read cache counters summed over all shards."""
+        totals = {"hits": 0, "misses": 0, "size": 0, "max_size": 0}
+        for shard in self.shards:
+            for name, value in shard.cache_stats().items():
+                totals[name] += value
+        return totals
+
+    def close(self) -> None:
+        """Stop the expiry sweeper and close the connections of every shard."""
+        self.stop_expiry_sweeper()
+        for shard in self.shards:
+            shard.close()
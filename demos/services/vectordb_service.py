@@ -1,8 +1,484 @@
-from services.openai_service import get_embeddings
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from services.openai_service import (
+    get_embeddings,
+    get_embeddings_batch,
+    embedding_model,
+)
+from services.bm25_service import BM25Index
 from services.logger_service import get_logger
 
 logger = get_logger(__name__)
 
+# Saved index layout: magic, header length, JSON header, then the float32
+# matrix, the uint64 text offsets, the UTF-8 chunk texts and any extra arrays
+# of the index type (see VectorIndex._sections) at aligned offsets.
+_INDEX_MAGIC = b"VIDX0001"
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class _MappedChunks:
+    """Read-only chunk list that decodes texts from a memory-mapped file on access."""
+
+    def __init__(self, offsets: np.ndarray, texts: np.ndarray):
+        self._offsets = offsets
+        self._texts = texts
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._texts[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class VectorIndex:
+    """In-memory embedding index for brute-force cosine similarity search.
+
+    Embeddings live in one contiguous float32 matrix whose rows are normalized
+    on insert, so a query is a single matrix-vector product followed by a
+    partial sort of the top scores.
+    """
+
+    def __init__(self, dim: int | None = None):
+        self.dim: int | None = dim
+        self.chunks: list[str] = []
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        # Set when saved or loaded, used to tell whether a saved index is stale
+        self.metadata: dict = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_items(cls, items: list[dict]) -> "VectorIndex":
+        """Build an index from [{"chunk": ..., "emb": [...]}, ...] items."""
+        index = cls()
+        index.add([item["chunk"] for item in items], [item["emb"] for item in items])
+        return index
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """The normalized embeddings, one row per chunk."""
+        return self._matrix[: self._size]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        # Zero vectors stay zero and score 0.0 against everything
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def add(self, chunks: list[str], embeddings: list) -> None:
+        """Add chunks with their embeddings. Failed embeddings are skipped."""
+        valid = [
+            (chunk, emb)
+            for chunk, emb in zip(chunks, embeddings)
+            if isinstance(emb, (list, tuple, np.ndarray)) and len(emb) > 0
+        ]
+        if len(valid) < len(chunks):
+            skipped = len(chunks) - len(valid)
+            logger.warning(f"Skipping {skipped} chunks without embeddings")
+        if not valid:
+            return
+        vectors = np.asarray([emb for _, emb in valid], dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._matrix = np.empty((0, self.dim), dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError("Vectors must be of the same length")
+        if not isinstance(self.chunks, list):
+            self.chunks = list(self.chunks)  # first insert after load()
+        needed = self._size + len(vectors)
+        if needed > len(self._matrix):
+            # Grow geometrically so repeated inserts stay amortized O(1)
+            capacity = max(needed, 2 * len(self._matrix))
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[: self._size] = self.matrix
+            self._matrix = grown
+        self._matrix[self._size : needed] = self._normalize(vectors)
+        start, self._size = self._size, needed
+        self.chunks.extend(chunk for chunk, _ in valid)
+        self._rows_added(start, needed)
+
+    def _rows_added(self, start: int, end: int) -> None:
+        """Hook for subclasses that index rows [start, end) after insert."""
+        pass
+
+    def remove(self, rows) -> int:
+        """Remove rows by position, compacting the index. Returns the number removed.
+
+        Remaining rows keep their relative order, so row positions after the
+        first removed one shift down.
+        """
+        keep = np.ones(self._size, dtype=bool)
+        keep[np.asarray(list(rows), dtype=np.int64)] = False
+        removed = self._size - int(keep.sum())
+        if removed == 0:
+            return 0
+        self._matrix = self.matrix[keep]  # copies, so a mapped file is never written
+        self.chunks = [chunk for chunk, kept in zip(self.chunks, keep) if kept]
+        self._size -= removed
+        self._rows_removed(keep)
+        return removed
+
+    def _rows_removed(self, keep: np.ndarray) -> None:
+        """Hook for subclasses to drop rows where keep is False and renumber others."""
+        pass
+
+    @property
+    def options(self) -> dict:
+        """Constructor arguments other than dim, passed back to load()."""
+        return {}
+
+    def _sections(self) -> dict:
+        """Hook for subclasses to save extra arrays with the index."""
+        return {}
+
+    def _restore(self, sections: dict) -> None:
+        """Hook for subclasses to rebuild their state from the saved arrays."""
+        self._rows_added(0, self._size)
+
+    def save(self, path: str, **metadata) -> None:
+        """Write the index to a single binary file that load() can memory-map.
+
+        Keyword arguments (model name, source hash, ...) are stored in the header.
+        The file is written next to its destination and renamed into place.
+        """
+        texts = [chunk.encode("utf-8") for chunk in self.chunks]
+        offsets = np.zeros(len(texts) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(text) for text in texts])
+        extra = {
+            name: np.ascontiguousarray(array)
+            for name, array in self._sections().items()
+        }
+        header = {"dim": self.dim or 0, "count": self._size, **metadata}
+        encoded = json.dumps(header).encode("utf-8")
+        # Section offsets depend on the header size, which includes them
+        while True:
+            matrix_offset = _aligned(len(_INDEX_MAGIC) + 8 + len(encoded))
+            offsets_offset = _aligned(matrix_offset + self.matrix.nbytes)
+            texts_offset = _aligned(offsets_offset + offsets.nbytes)
+            end = texts_offset + int(offsets[-1])
+            sections = {}
+            for name, array in extra.items():
+                sections[name] = {
+                    "offset": _aligned(end),
+                    "dtype": array.dtype.str,
+                    "shape": list(array.shape),
+                }
+                end = _aligned(end) + array.nbytes
+            header.update(
+                matrix_offset=matrix_offset,
+                offsets_offset=offsets_offset,
+                texts_offset=texts_offset,
+                sections=sections,
+            )
+            encoded = json.dumps(header).encode("utf-8")
+            if _aligned(len(_INDEX_MAGIC) + 8 + len(encoded)) == matrix_offset:
+                break
+        logger.info(f"Saving vector index with {self._size} chunks to {path}")
+        # A temp file of its own, so workers saving at once never share one
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(path) + ".",
+            suffix=".tmp",
+            dir=os.path.dirname(path) or ".",
+        )
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_INDEX_MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+                for offset, data in (
+                    (matrix_offset, np.ascontiguousarray(self.matrix).tobytes()),
+                    (offsets_offset, offsets.tobytes()),
+                    (texts_offset, b"".join(texts)),
+                    *(
+                        (sections[name]["offset"], a.tobytes())
+                        for name, a in extra.items()
+                    ),
+                ):
+                    file.write(b"\0" * (offset - file.tell()))
+                    file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.metadata = {k: v for k, v in header.items() if k not in ("dim", "count")}
+
+    @staticmethod
+    def read_header(path: str) -> dict:
+        """Read the JSON header of a saved index without mapping its data."""
+        with open(path, "rb") as file:
+            if file.read(len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+                raise ValueError(f"{path} is not a saved vector index.")
+            (length,) = struct.unpack("<Q", file.read(8))
+            return json.loads(file.read(length))
+
+    @classmethod
+    def load(cls, path: str, **options) -> "VectorIndex":
+        """Open a saved index with its vectors and texts memory-mapped read-only.
+
+        Pages are shared through the OS cache by every process that maps the
+        file. Keyword arguments go to the constructor, e.g. n_lists for IVF.
+        """
+        header = cls.read_header(path)
+        count, dim = header["count"], header["dim"]
+        logger.info(f"Loading vector index with {count} chunks from {path}")
+        index = cls(dim=dim or None, **options)
+        if count:
+            index._matrix = np.memmap(
+                path, np.float32, "r", header["matrix_offset"], (count, dim)
+            )
+            offsets = np.memmap(
+                path, np.uint64, "r", header["offsets_offset"], (count + 1,)
+            )
+            texts_size = int(offsets[-1])
+            texts = (
+                np.memmap(path, np.uint8, "r", header["texts_offset"], (texts_size,))
+                if texts_size
+                else np.zeros(0, dtype=np.uint8)
+            )
+            index.chunks = _MappedChunks(offsets, texts)
+            index._size = count
+            sections = {}
+            for name, spec in header.get("sections", {}).items():
+                shape = tuple(spec["shape"])
+                sections[name] = np.memmap(
+                    path, spec["dtype"], "r", spec["offset"], shape
+                )
+            index._restore(sections)
+        index.metadata = {k: v for k, v in header.items() if k not in ("dim", "count")}
+        return index
+
+    def _top(
+        self,
+        scores: np.ndarray,
+        relevance: float,
+        limit: int,
+        rows: np.ndarray | None = None,
+    ) -> list:
+        """Pick the best scores. rows maps score positions to matrix rows."""
+        if limit < len(scores):
+            best = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            (self.chunks[i if rows is None else rows[i]], float(scores[i]))
+            for i in best
+            if scores[i] >= relevance
+        ]
+
+    def search(
+        self, query_embedding: list[float], relevance: float = 0.5, limit: int = 2
+    ) -> list:
+        """Return up to limit (chunk, similarity) pairs scoring at least relevance."""
+        return self.search_batch([query_embedding], relevance, limit)[0]
+
+    def search_batch(
+        self, query_embeddings: list, relevance: float = 0.5, limit: int = 2
+    ) -> list[list]:
+        """Search several queries at once with a single matrix product."""
+        if self._size == 0 or limit <= 0:
+            return [[] for _ in query_embeddings]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.dim:
+            raise ValueError("Vectors must be of the same length")
+        scores = self._normalize(queries) @ self.matrix.T
+        return [self._top(row, relevance, limit) for row in scores]
+
+
+class IVFVectorIndex(VectorIndex):
+    """Approximate nearest-neighbor index using an inverted file (IVF).
+
+    A spherical k-means coarse quantizer splits the vectors into n_lists
+    clusters. A query only scores the vectors of its n_probe closest clusters,
+    so raising n_probe trades latency for recall. Until enough vectors exist to
+    train the quantizer, searches fall back to brute force. Vectors added after
+    training are assigned to their nearest centroid, so inserts stay cheap.
+    Call train() again after large shifts in the data.
+    """
+
+    def __init__(
+        self,
+        dim: int | None = None,
+        n_lists: int = 256,
+        n_probe: int = 8,
+        kmeans_iters: int = 20,
+        min_train_per_list: int = 39,
+        max_train_per_list: int = 256,
+        seed: int = 0,
+    ):
+        super().__init__(dim)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.kmeans_iters = kmeans_iters
+        self.min_train_per_list = min_train_per_list
+        self.max_train_per_list = max_train_per_list
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self.centroids: np.ndarray | None = None
+        self._lists: list[list[int]] = []
+        self._list_rows: list[np.ndarray | None] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self) -> None:
+        """Fit the coarse quantizer on a sample of the vectors and rebuild the lists."""
+        if self._size == 0:
+            raise ValueError("Cannot train an empty index.")
+        n_lists = min(self.n_lists, self._size)
+        logger.info(f"Training IVF index with {n_lists} lists on {self._size} vectors")
+        sample_size = min(self._size, n_lists * self.max_train_per_list)
+        sample = self.matrix[self._rng.choice(self._size, sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, n_lists, replace=False)]
+        for _ in range(self.kmeans_iters):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Reseed empty clusters with random sample points
+                sums[empty] = sample[self._rng.choice(sample_size, empty.sum())]
+            centroids = self._normalize(sums)
+        self.centroids = centroids
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_rows = [None] * n_lists
+        self._assign(0, self._size)
+
+    def _assign(self, start: int, end: int) -> None:
+        """Append rows [start, end) to the inverted list of their nearest centroid."""
+        for offset in range(start, end, 4096):
+            stop = min(offset + 4096, end)
+            nearest = np.argmax(self._matrix[offset:stop] @ self.centroids.T, axis=1)
+            for row, list_id in enumerate(nearest, start=offset):
+                self._lists[list_id].append(row)
+                self._list_rows[list_id] = None
+
+    def _rows_added(self, start: int, end: int) -> None:
+        if self.is_trained:
+            self._assign(start, end)
+        elif self._size >= self.n_lists * self.min_train_per_list:
+            self.train()
+
+    def _rows_removed(self, keep: np.ndarray) -> None:
+        if self.is_trained:
+            renumbered = np.cumsum(keep) - 1
+            self._lists = [
+                [int(renumbered[row]) for row in rows if keep[row]]
+                for rows in self._lists
+            ]
+            self._list_rows = [None] * len(self._lists)
+
+    @property
+    def options(self) -> dict:
+        return {
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "kmeans_iters": self.kmeans_iters,
+            "min_train_per_list": self.min_train_per_list,
+            "max_train_per_list": self.max_train_per_list,
+            "seed": self.seed,
+        }
+
+    def _sections(self) -> dict:
+        """Save the centroids and the lists, so a loaded index is not retrained."""
+        if not self.is_trained:
+            return {}
+        list_offsets = np.zeros(len(self._lists) + 1, dtype=np.uint64)
+        list_offsets[1:] = np.cumsum([len(rows) for rows in self._lists])
+        list_rows = np.fromiter(
+            (row for rows in self._lists for row in rows),
+            dtype=np.int64,
+            count=int(list_offsets[-1]),
+        )
+        return {
+            "centroids": self.centroids,
+            "list_offsets": list_offsets,
+            "list_rows": list_rows,
+        }
+
+    def _restore(self, sections: dict) -> None:
+        if "centroids" not in sections:
+            return super()._restore(sections)
+        self.centroids = np.array(sections["centroids"])
+        offsets, rows = sections["list_offsets"], sections["list_rows"]
+        self._lists = [
+            rows[int(start) : int(end)].tolist()
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+        self._list_rows = [None] * len(self._lists)
+
+    def _rows_of(self, list_id: int) -> np.ndarray:
+        rows = self._list_rows[list_id]
+        if rows is None:
+            rows = np.asarray(self._lists[list_id], dtype=np.int64)
+            self._list_rows[list_id] = rows
+        return rows
+
+    def search_batch(
+        self,
+        query_embeddings: list,
+        relevance: float = 0.5,
+        limit: int = 2,
+        n_probe: int | None = None,
+    ) -> list[list]:
+        """Search several queries, scoring only the n_probe closest lists of each."""
+        if not self.is_trained:
+            return super().search_batch(query_embeddings, relevance, limit)
+        if limit <= 0:
+            return [[] for _ in query_embeddings]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.dim:
+            raise ValueError("Vectors must be of the same length")
+        queries = self._normalize(queries)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+        results = []
+        for query, lists in zip(queries, probes):
+            rows = np.concatenate([self._rows_of(list_id) for list_id in lists])
+            scores = self._matrix[rows] @ query
+            results.append(self._top(scores, relevance, limit, rows))
+        return results
+
+
+def measure_recall(
+    index: VectorIndex, query_embeddings: list, limit: int = 10, **search_options
+) -> float:
+    """Fraction of the exact top-limit chunks that the index returns (recall@limit).
+
+    Extra keyword arguments, such as n_probe, are passed to index.search_batch.
+    """
+    exact = VectorIndex.search_batch(index, query_embeddings, -1.0, limit)
+    approx = index.search_batch(query_embeddings, -1.0, limit, **search_options)
+    expected = sum(len(hits) for hits in exact)
+    if expected == 0:
+        return 1.0
+    found = sum(
+        len({chunk for chunk, _ in a} & {chunk for chunk, _ in e})
+        for a, e in zip(approx, exact)
+    )
+    return found / expected
+
 
 def read_file():
     logger.info("Reading file content...")
@@ -18,44 +494,131 @@ def read_file():
     return file_content
 
 
-async def poor_mans_vectordb():
-    """Create a simple vector database from the file content."""
+async def poor_mans_vectordb(
+    index: VectorIndex | None = None, index_path: str | None = "demos/data/faq.vidx"
+) -> VectorIndex:
+    """Create a simple vector database from the file content.
+
+    Pass an IVFVectorIndex to use approximate search on large corpora. When
+    index_path holds an index built from the same content with the same
+    embedding model it is memory-mapped instead of re-embedding the file.
+    """
     # logger.info("Creating vector database from file content...")
     logger.info(f"Creating a simple vector database from the file content...")
-    paragraphs = read_file().split("\n\n")
-    poor_man_vectordb = [
-        {"chunk": p, "emb": await get_embeddings(p)} for p in paragraphs
-    ]
-    return poor_man_vectordb
-
-
-def _consine_similarity(vec1, vec2):
-    """Calculate cosine similarity between two vectors."""
-    # logger.info("Calculating cosine similarity...")
-    if len(vec1) != len(vec2):
-        raise ValueError("Vectors must be of the same length")
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    norm_a = sum(a**2 for a in vec1) ** 0.5
-    norm_b = sum(b**2 for b in vec2) ** 0.5
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot_product / (norm_a * norm_b)
+    content = read_file()
+    source_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    index = index if index is not None else VectorIndex()
+    if index_path and os.path.exists(index_path):
+        header = VectorIndex.read_header(index_path)
+        if (
+            header.get("model") == embedding_model
+            and header.get("source_hash") == source_hash
+        ):
+            return type(index).load(index_path, **index.options)
+        logger.info(f"Saved index {index_path} is stale, rebuilding it")
+    paragraphs = content.split("\n\n")
+    before = len(index)
+    index.add(paragraphs, await get_embeddings_batch(paragraphs))
+    if index_path:
+        if len(index) - before < len(paragraphs):
+            # Without the hash the index is rebuilt, and the failed chunks
+            # embedded again, on the next start
+            logger.warning(f"Saving {index_path} as stale, some embeddings failed")
+            source_hash = None
+        index.save(index_path, model=embedding_model, source_hash=source_hash)
+    return index
+
+
+def _as_index(vectordb: VectorIndex | list) -> VectorIndex:
+    """Accept a VectorIndex or a legacy list of {"chunk", "emb"} items."""
+    if isinstance(vectordb, VectorIndex):
+        return vectordb
+    return VectorIndex.from_items(vectordb)
 
 
 async def search_vectordb(
-    query: str, vectordb: list, relevance: float = 0.5, limit: int = 2
+    query: str, vectordb: VectorIndex | list, relevance: float = 0.5, limit: int = 2
 ) -> list:
     """Search the vector database for the most similar chunks to the query."""
     logger.info("Searching vector database for relevant chunks...")
     query_embedding = await get_embeddings(query)
-    results = []
-    for item in vectordb:
-        similarity = _consine_similarity(query_embedding, item["emb"])
-        if similarity >= relevance:
-            results.append((item["chunk"], similarity))
-
-    # Sort by similarity score in descending order
-    if len(results) == 0:
+    if not isinstance(query_embedding, list) or not query_embedding:
+        logger.error(f"Could not embed the query: {query_embedding}")
         return []
-    results.sort(key=lambda x: x[1], reverse=True)
-    return results[:limit]  # Return top 5 results
+    return _as_index(vectordb).search(query_embedding, relevance, limit)
+
+
+async def search_hybrid(
+    query: str,
+    vectordb: VectorIndex | list,
+    lexical: BM25Index,
+    relevance: float = 0.5,
+    limit: int = 2,
+    mode: str = "hybrid",
+    embedding_timeout: float | None = None,
+    candidates: int = 20,
+    rrf_k: int = 60,
+    lexical_relevance: float = 1.0,
+) -> list:
+    """Search with BM25, vectors or both fused by reciprocal rank fusion (RRF).
+
+    Args:
+        mode: "hybrid" fuses both rankings, "lexical" skips the embedding call
+            and "vector" behaves like search_vectordb.
+        embedding_timeout: Seconds to wait for the query embedding. A hybrid
+            search whose embedding fails or times out returns the BM25 results.
+        candidates: How many results of each ranking take part in the fusion.
+        rrf_k: RRF constant, larger values flatten the rank contributions.
+        lexical_relevance: Minimum BM25 score of a lexical result, so chunks
+            that only share a common word with the query are not returned or
+            fused. relevance is the same floor for cosine similarities.
+
+    Returns:
+        Up to limit (chunk, score) pairs. Scores are BM25 scores in lexical mode,
+        cosine similarities in vector mode and RRF scores in hybrid mode.
+    """
+    if mode == "lexical":
+        return lexical.search(query, limit, lexical_relevance)
+    if mode not in ("hybrid", "vector"):
+        raise ValueError(f"Unknown search mode: {mode}")
+    try:
+        query_embedding = await asyncio.wait_for(
+            get_embeddings(query), embedding_timeout
+        )
+    except asyncio.TimeoutError:
+        query_embedding = "Error: embedding timed out"
+    if not isinstance(query_embedding, list) or not query_embedding:
+        logger.warning(f"Could not embed the query, using BM25: {query_embedding}")
+        return lexical.search(query, limit, lexical_relevance)
+    index = _as_index(vectordb)
+    if mode == "vector":
+        return index.search(query_embedding, relevance, limit)
+    rankings = (
+        index.search(query_embedding, relevance, candidates),
+        lexical.search(query, candidates, lexical_relevance),
+    )
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (chunk, _) in enumerate(ranking, start=1):
+            fused[chunk] = fused.get(chunk, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+async def search_vectordb_batch(
+    queries: list[str],
+    vectordb: VectorIndex | list,
+    relevance: float = 0.5,
+    limit: int = 2,
+) -> list[list]:
+    """Search the vector database for several queries with one matrix product."""
+    logger.info(f"Searching vector database for {len(queries)} queries...")
+    embeddings = await get_embeddings_batch(queries)
+    valid = [i for i, emb in enumerate(embeddings) if isinstance(emb, list) and emb]
+    results: list[list] = [[] for _ in queries]
+    if valid:
+        found = _as_index(vectordb).search_batch(
+            [embeddings[i] for i in valid], relevance, limit
+        )
+        for i, hits in zip(valid, found):
+            results[i] = hits
+    return results
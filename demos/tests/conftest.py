@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# The demos import their modules as top-level "services" and "tools" packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings refuse to load without these. Tests never reach the real services,
+# and any store they open lives in a scratch directory.
+_scratch = tempfile.mkdtemp(prefix="demos-tests-")
+for name, value in {
+    "VERSION": "2024-10-21",
+    "ENDPOINT": "https://example.invalid",
+    "CONNECTION_STRING": "test",
+    "KEY": "test",
+    "EMBEDDING_CACHE_PATH": "",
+    "STORE_BACKEND": "sqlite",
+    "STORE_PATH": os.path.join(_scratch, "store.db"),
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,282 @@
+from types import SimpleNamespace
+
+import pytest
+from azure.ai.agents import AgentsClient
+from azure.ai.agents.models import (
+    AgentStreamEvent,
+    MessageDeltaChunk,
+    ThreadMessage,
+    ThreadRun,
+)
+from azure.ai.agents.operations import (
+    FilesOperations,
+    MessagesOperations,
+    RunsOperations,
+    ThreadsOperations,
+)
+
+from services.agent_service import AgentService
+from services.run_poller import RunPoller
+
+
+def _delta(text):
+    return MessageDeltaChunk(
+        {
+            "id": "msg",
+            "object": "thread.message.delta",
+            "delta": {
+                "role": "assistant",
+                "content": [{"index": 0, "type": "text", "text": {"value": text}}],
+            },
+        }
+    )
+
+
+def _run(status, *call_ids):
+    run = {"id": "run", "thread_id": "thread", "status": status}
+    if call_ids:
+        run["required_action"] = {
+            "type": "submit_tool_outputs",
+            "submit_tool_outputs": {
+                "tool_calls": [
+                    {
+                        "id": call_id,
+                        "type": "function",
+                        "function": {"name": "current_time", "arguments": "{}"},
+                    }
+                    for call_id in call_ids
+                ]
+            },
+        }
+    return ThreadRun(run)
+
+
+_OPERATIONS = {
+    "files": FilesOperations,
+    "messages": MessagesOperations,
+    "runs": RunsOperations,
+    "threads": ThreadsOperations,
+}
+
+
+def _client(**agents):
+    """A fake project client whose agents only have what the installed SDK has."""
+    for name, value in agents.items():
+        if name not in _OPERATIONS:
+            assert hasattr(AgentsClient, name), name
+            continue
+        for method in (m for m in dir(value) if not m.startswith("_")):
+            if callable(getattr(value, method)):
+                assert hasattr(_OPERATIONS[name], method), f"{name}.{method}"
+    return SimpleNamespace(agents=SimpleNamespace(**agents))
+
+
+class FakeThreads:
+    def __init__(self):
+        self.created = 0
+        self.deleted = []
+
+    def create(self):
+        self.created += 1
+        return SimpleNamespace(id=f"thread-{self.created}")
+
+    def delete(self, thread_id):
+        self.deleted.append(thread_id)
+
+
+class FakeMessages:
+    def __init__(self):
+        self.created = []
+
+    def create(self, thread_id, role, content):
+        self.created.append((thread_id, content))
+
+    def list(self, thread_id, run_id, order, limit):
+        text = {"type": "text", "text": {"value": f"Answer to {run_id}"}}
+        return iter([ThreadMessage({"id": "msg", "content": [text]})])
+
+
+def _event(data):
+    if isinstance(data, MessageDeltaChunk):
+        return AgentStreamEvent.THREAD_MESSAGE_DELTA, data, None
+    if isinstance(data, ThreadRun):
+        return f"thread.run.{data.status}", data, None
+    return AgentStreamEvent.ERROR, data, None
+
+
+class FakeStream:
+    """Event handler like the SDK's: submitting tool outputs with it as
+    event_handler appends the events of the rest of the run to its iteration."""
+
+    def __init__(self, events):
+        self.events = list(events)
+
+    def __iter__(self):
+        while self.events:
+            yield _event(self.events.pop(0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeRuns:
+    def __init__(self, first, after_submit=()):
+        self.first = first
+        self.after_submit = after_submit
+        self.opened = None
+        self.submitted = []
+        self.handlers = []
+        self.cancelled = []
+
+    def stream(self, thread_id, agent_id):
+        self.opened = FakeStream(self.first)
+        return self.opened
+
+    def submit_tool_outputs_stream(
+        self, thread_id, run_id, tool_outputs, event_handler
+    ):
+        self.submitted.append((run_id, tool_outputs))
+        self.handlers.append(event_handler)
+        event_handler.events.extend(self.after_submit)
+
+    def cancel(self, thread_id, run_id):
+        self.cancelled.append(run_id)
+
+
+@pytest.fixture
+def make_agent():
+    def make(runs, tool_outputs=None):
+        agent = AgentService(
+            "test-agent-service", thread_pool_size=0, tool_outputs=tool_outputs
+        )
+        agent.client = _client(
+            runs=runs, threads=FakeThreads(), messages=FakeMessages()
+        )
+        agent.agent = SimpleNamespace(id="agent")
+        return agent
+
+    return make
+
+
+class PolledRuns:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+
+    def create(self, thread_id, agent_id):
+        return SimpleNamespace(id="run", status="queued")
+
+    def get(self, thread_id, run_id):
+        return SimpleNamespace(id=run_id, status=self.statuses.pop(0))
+
+    def cancel(self, thread_id, run_id):
+        pass
+
+
+def test_process_returns_the_run_answer():
+    agent = AgentService("test-agent-process", thread_pool_size=0)
+    agent.poller = RunPoller(initial_interval=0, max_interval=0)
+    messages = FakeMessages()
+    agent.client = _client(
+        runs=PolledRuns(["in_progress", "completed"]),
+        threads=FakeThreads(),
+        messages=messages,
+    )
+    agent.agent = SimpleNamespace(id="agent")
+    assert agent.process("user", "hi") == "Answer to run\n"
+    assert messages.created == [("thread-1", "hi")]
+
+
+def test_stream_yields_text_deltas(make_agent):
+    runs = FakeRuns(
+        [_run("in_progress"), _delta("Hel"), _delta("lo"), _run("completed")]
+    )
+    agent = make_agent(runs)
+    assert list(agent.process_stream("user", "hi")) == ["Hel", "lo"]
+    assert runs.submitted == []
+
+
+def test_stream_submits_tool_outputs_and_continues(make_agent):
+    runs = FakeRuns(
+        [_run("requires_action", "call-1")],
+        after_submit=[_delta("It is noon"), _run("completed")],
+    )
+
+    def tool_outputs(run):
+        return [
+            {"tool_call_id": call.id, "output": "12:00"}
+            for call in run.required_action.submit_tool_outputs.tool_calls
+        ]
+
+    agent = make_agent(runs, tool_outputs)
+    assert list(agent.process_stream("user", "what time is it?")) == ["It is noon"]
+    assert runs.submitted == [("run", [{"tool_call_id": "call-1", "output": "12:00"}])]
+    # The SDK chains the submitted run onto the handler it is given
+    assert runs.handlers == [runs.opened]
+    assert runs.cancelled == []
+
+
+def test_stream_cancels_when_tools_cannot_run(make_agent):
+    runs = FakeRuns(
+        [_delta("Let me check"), _run("requires_action", "call-1"), _run("cancelled")]
+    )
+    agent = make_agent(runs)
+    assert list(agent.process_stream("user", "what time is it?")) == ["Let me check"]
+    assert runs.submitted == []
+    assert runs.cancelled == ["run"]
+
+
+def test_stream_stops_on_failed_run(make_agent):
+    runs = FakeRuns([_delta("Partial"), _run("failed"), "server error"])
+    agent = make_agent(runs)
+    assert list(agent.process_stream("user", "hi")) == ["Partial"]
+
+
+def test_pooled_threads_are_stored_and_cleaned_up():
+    threads = FakeThreads()
+    agent = AgentService("test-thread-pool", thread_pool_size=1)
+    agent.client = _client(threads=threads, delete_agent=lambda agent_id: None)
+    agent.agent = SimpleNamespace(id="agent")
+    agent.state.set("test-thread-pool", "agentid", "agent")
+    agent._fill_thread_pool()
+    assert agent.state.get("test-thread-pool", "pool-thread-1") == "thread-1"
+
+    assert agent._get_thread("user").id == "thread-1"
+    assert not agent.state.exists("test-thread-pool", "pool-thread-1")
+    assert agent._get_thread("user") is agent._get_thread("user")
+    # The mapping went away, e.g. a reset in another worker: the cached
+    # handle is not used any more
+    agent.state.delete("test-thread-pool", "thread-user")
+    assert agent._get_thread("user").id != "thread-1"
+
+    # The user's new thread and whatever was pooled are deleted with the agent
+    agent._fill_thread_pool()
+    agent.clean_up()
+    pooled = [f"thread-{n}" for n in range(2, threads.created + 1)]
+    assert pooled and sorted(threads.deleted) == pooled
+    # The agent's own store, read cache included, forgets everything
+    assert agent.state.get("test-thread-pool", "agentid") is None
+    assert agent.state.get("test-thread-pool", "thread-user") is None
+
+
+def test_workers_never_share_a_pooled_thread():
+    threads = FakeThreads()
+    client = _client(threads=threads)
+    workers = []
+    for _ in range(2):
+        worker = AgentService("test-shared-pool", thread_pool_size=0)
+        worker.client = client
+        workers.append(worker)
+    workers[0].thread_pool_size = 1
+    workers[0]._fill_thread_pool()
+    workers[0].thread_pool_size = 0
+    # Both workers loaded the pooled thread at startup
+    workers[1]._thread_pool.extend(workers[0]._thread_pool)
+
+    first = workers[0]._assign_thread("user1").id
+    second = workers[1]._assign_thread("user2").id
+    assert first == "thread-1"
+    assert second == "thread-2"
+    assert workers[1].state.get("test-shared-pool", "thread-user2") == "thread-2"
@@ -0,0 +1,59 @@
+import asyncio
+
+import services.vectordb_service as vectordb_service
+from services.bm25_service import BM25Index
+from services.vectordb_service import VectorIndex, search_hybrid
+
+CHUNKS = [
+    "The whistleblower policy protects employees who report misconduct.",
+    "Our offices are closed on public holidays and at the end of the year.",
+    "Employees can take twenty vacation days a year.",
+]
+
+
+def test_stopwords_do_not_match():
+    index = BM25Index(CHUNKS)
+    assert index.search("what is the", limit=3) == []
+
+
+def test_min_score_drops_weak_matches():
+    index = BM25Index(CHUNKS)
+    results = index.search("whistleblower policy employees", limit=3)
+    assert [chunk for chunk, _ in results][0] == CHUNKS[0]
+    weakest = results[-1][1]
+    floored = index.search("whistleblower policy employees", 3, min_score=weakest)
+    assert len(floored) == len(results) - 1
+
+
+def _failed_embedding(monkeypatch):
+    async def get_embeddings(text):
+        return "Error: unavailable"
+
+    monkeypatch.setattr(vectordb_service, "get_embeddings", get_embeddings)
+
+
+def test_hybrid_fallback_applies_lexical_relevance(monkeypatch):
+    _failed_embedding(monkeypatch)
+    lexical = BM25Index(CHUNKS)
+    query = "how many vacation days do employees get"
+    results = asyncio.run(search_hybrid(query, VectorIndex(), lexical, limit=3))
+    assert [chunk for chunk, _ in results] == [CHUNKS[2]]
+    unfloored = asyncio.run(
+        search_hybrid(query, VectorIndex(), lexical, limit=3, lexical_relevance=0.0)
+    )
+    assert len(unfloored) == 2
+
+
+def test_hybrid_fusion_leaves_out_weak_lexical_matches(monkeypatch):
+    vectors = {CHUNKS[0]: [1.0, 0.0], CHUNKS[1]: [0.0, 1.0], CHUNKS[2]: [0.0, 1.0]}
+
+    async def get_embeddings(text):
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(vectordb_service, "get_embeddings", get_embeddings)
+    index = VectorIndex()
+    index.add(CHUNKS, [vectors[chunk] for chunk in CHUNKS])
+    lexical = BM25Index(CHUNKS)
+    query = "whistleblower rules for employees"
+    results = asyncio.run(search_hybrid(query, index, lexical, limit=3))
+    assert [chunk for chunk, _ in results] == [CHUNKS[0]]
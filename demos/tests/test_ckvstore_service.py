@@ -0,0 +1,18 @@
+import gc
+import threading
+
+from services.ckvstore_service import CategoryKeyValueStore
+
+
+def test_connections_of_finished_threads_are_closed(tmp_path):
+    store = CategoryKeyValueStore(str(tmp_path / "store.db"))
+    for i in range(50):
+        writer = threading.Thread(target=store.set, args=("c", f"k{i}", i))
+        writer.start()
+        writer.join()
+    gc.collect()
+    # Only the connection of this thread is left open
+    assert len(store._connections) == 1
+    assert store.size("c") == 50
+    store.close()
+    assert store._connections == []
@@ -0,0 +1,26 @@
+import asyncio
+import os
+
+import services.ingestion_service as ingestion_service
+from services.ingestion_service import ingest_directory
+from services.memory_kvstore_service import InMemoryKeyValueStore
+
+
+def test_unchanged_index_is_not_rewritten(tmp_path, monkeypatch):
+    async def get_embeddings_batch(texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(ingestion_service, "get_embeddings_batch", get_embeddings_batch)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "policy.txt").write_text("Employees can take twenty vacation days.")
+    store = InMemoryKeyValueStore()
+    index_path = str(tmp_path / "docs.vidx")
+
+    asyncio.run(ingest_directory(str(docs), store, index_path))
+    saved = os.stat(index_path).st_mtime_ns
+    os.utime(index_path, ns=(saved - 10**9, saved - 10**9))
+
+    ingestor = asyncio.run(ingest_directory(str(docs), store, index_path))
+    assert len(ingestor.index) == 1
+    assert os.stat(index_path).st_mtime_ns == saved - 10**9
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.run_poller import RunPoller
+
+
+def _run(status, *call_ids):
+    tool_calls = [SimpleNamespace(id=call_id) for call_id in call_ids]
+    return SimpleNamespace(
+        id="run",
+        status=status,
+        required_action=SimpleNamespace(
+            submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls)
+        ),
+    )
+
+
+# The run still asks for call-1 right after it was submitted, then for call-2
+RUNS = [
+    _run("requires_action", "call-1"),
+    _run("requires_action", "call-1"),
+    _run("requires_action", "call-2"),
+    _run("requires_action", "call-2"),
+    _run("completed"),
+]
+
+
+def test_tool_calls_are_submitted_once():
+    runs = iter(RUNS)
+    submitted = []
+    poller = RunPoller(initial_interval=0, max_interval=0)
+    run = poller.wait(
+        lambda: next(runs),
+        on_requires_action=lambda run: submitted.append(
+            run.required_action.submit_tool_outputs.tool_calls[0].id
+        ),
+    )
+    assert run.status == "completed"
+    assert submitted == ["call-1", "call-2"]
+
+
+def test_tool_calls_are_submitted_once_async():
+    runs = iter(RUNS)
+    submitted = []
+
+    async def get_run():
+        return next(runs)
+
+    async def submit(run):
+        submitted.append(run.required_action.submit_tool_outputs.tool_calls[0].id)
+
+    poller = RunPoller(initial_interval=0, max_interval=0)
+    run = asyncio.run(poller.wait_async(get_run, on_requires_action=submit))
+    assert run.status == "completed"
+    assert submitted == ["call-1", "call-2"]
@@ -1,6 +1,8 @@
+import asyncio
 import json
 
 from azure.ai.projects import AIProjectClient
+from azure.ai.projects.aio import AIProjectClient as AsyncAIProjectClient
 from azure.ai.agents.models import AgentThread, ThreadRun
 from tools.email_tool import mock_send_email
 from tools.time_tool import current_time
@@ -12,10 +14,8 @@ logger = get_logger(__name__)
 user_functions = {fetch_weather, current_time, mock_send_email}
 
 
-def tools_delegate(client: AIProjectClient, thread: AgentThread, run: ThreadRun):
-    logger.info(
-        f"Delegating tools for thread {thread.id} and run {run.id} with required action: {run.required_action}"
-    )
+def tool_outputs_for(run: ThreadRun) -> list[dict]:
+    """Run the functions a run asked for and collect their outputs."""
     tool_calls = run.required_action.submit_tool_outputs.tool_calls
     tool_outputs = []
 
@@ -28,6 +28,27 @@ def tools_delegate(client: AIProjectClient, thread: AgentThread, run: ThreadRun)
             output = current_time()
             tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
 
-    client.agents.submit_tool_outputs_to_run(
+    return tool_outputs
+
+
+def tools_delegate(client: AIProjectClient, thread: AgentThread, run: ThreadRun):
+    logger.info(
+        f"Delegating tools for thread {thread.id} and run {run.id} with required action: {run.required_action}"
+    )
+    tool_outputs = tool_outputs_for(run)
+    client.agents.runs.submit_tool_outputs(
+        thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
+    )
+
+
+async def async_tools_delegate(
+    client: AsyncAIProjectClient, thread: AgentThread, run: ThreadRun
+):
+    """tools_delegate for the async client. Tools run off the event loop."""
+    logger.info(
+        f"Delegating tools for thread {thread.id} and run {run.id} with required action: {run.required_action}"
+    )
+    tool_outputs = await asyncio.to_thread(tool_outputs_for, run)
+    await client.agents.runs.submit_tool_outputs(
         thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
     )